@@ -0,0 +1,220 @@
+import functools
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from recipes.cache import recipes_cache
+from recipes.models import Recipe, RecipeIngredient, Tag
+from recipes.user_lists import carts, favorites, subscriptions
+from . import pool
+from .serializers import (RecipeIngredientSerializer, RecipeListSerializer,
+                          TagSerializer)
+from .views import IngredientViewSet, RecipesViewSet, TagViewSet
+
+NO_USER_STATE = (frozenset(), frozenset(), frozenset())
+
+
+def render(data):
+    return HttpResponse(JSONRenderer().render(data),
+                        content_type='application/json')
+
+
+def authenticate(request):
+    """
+    Аутентифицирует запрос классами DEFAULT_AUTHENTICATION_CLASSES, как
+    это делает DRF, и возвращает пользователя.
+    """
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return AnonymousUser()
+
+
+def user_state_calls(user):
+    """Вызовы для загрузки множеств избранного, покупок и подписок."""
+    if not user.is_authenticated:
+        return ()
+    return ((favorites.ids, user.pk), (carts.ids, user.pk),
+            (subscriptions.ids, user.pk))
+
+
+async def reference(request, viewset, action, pk=''):
+    """
+    Ответ справочного вьюсета из reference_cache с поддержкой условных
+    запросов, как в ReferenceCacheMixin. Запрос аутентифицируется, как в
+    DRF, параллельно с чтением кэша. При промахе кэша возвращает None.
+    """
+    cache = viewset.reference_cache
+    key = viewset.reference_cache_key(action, pk, request.GET)
+
+    def lookup():
+        version = cache.version()
+        return version, cache.get(key, version)
+
+    request.user, (version, data) = await pool.gather(
+        (authenticate, request), (lookup,)
+    )
+    etag, last_modified = viewset.reference_validators(version, key)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if data is None:
+            return None
+        response = render(data)
+    return viewset.set_reference_headers(response, etag, last_modified)
+
+
+async def tag_list(request):
+    return await reference(request, TagViewSet, 'list')
+
+
+async def tag_detail(request, pk):
+    return await reference(request, TagViewSet, 'retrieve', pk)
+
+
+async def ingredient_list(request):
+    return await reference(request, IngredientViewSet, 'list')
+
+
+async def ingredient_detail(request, pk):
+    return await reference(request, IngredientViewSet, 'retrieve', pk)
+
+
+async def recipe_list(request):
+    """
+    Страница списка рецептов из recipes_cache с подстановкой состояния
+    пользователя, как в RecipesViewSet.list. Страница и множества id
+    пользователя загружаются параллельно.
+    """
+    params = request.GET
+    if 'is_favorited' in params or 'is_in_shopping_cart' in params:
+        return None
+    request.user = await pool.run(authenticate, request)
+    key = RecipesViewSet.get_list_cache_key(request)
+
+    def lookup():
+        version = recipes_cache.version()
+        return version, recipes_cache.get(key, version)
+
+    (version, data), *state = await pool.gather(
+        (lookup,), *user_state_calls(request.user)
+    )
+    if data is None:
+        return None
+    results = RecipesViewSet.overlay_user_state(
+        data['results'], *(state or NO_USER_STATE)
+    )
+    etag = RecipesViewSet.get_list_etag(version, key, results)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render({**data, 'results': results})
+    return RecipesViewSet.set_conditional_headers(response, etag)
+
+
+def serialize_recipe(request, recipe, tags, ingredients):
+    """
+    Представление рецепта RecipeListSerializer с тегами и ингредиентами,
+    загруженными отдельно.
+    """
+    serializer = RecipeListSerializer(recipe, context={'request': request})
+    serializer.fields.pop('tags')
+    serializer.fields.pop('ingredients')
+    data = serializer.data
+    data['tags'] = TagSerializer(tags, many=True).data
+    data['ingredients'] = RecipeIngredientSerializer(
+        ingredients, many=True
+    ).data
+    return {name: data[name] for name in RecipeListSerializer.Meta.fields}
+
+
+async def recipe_detail(request, pk):
+    """
+    Рецепт с поддержкой условных запросов, как в RecipesViewSet.retrieve.
+    Рецепт с автором и множества id пользователя загружаются параллельно,
+    а теги и ингредиенты - параллельно после проверки ETag. Для
+    несуществующего рецепта возвращает None.
+    """
+    try:
+        pk = int(pk)
+    except ValueError:
+        return None
+    request.user = await pool.run(authenticate, request)
+    recipe, *state = await pool.gather(
+        (Recipe.objects.select_related('author').defer(
+            'search_vector'
+        ).filter(pk=pk).first,),
+        *user_state_calls(request.user)
+    )
+    if recipe is None:
+        return None
+    favorited, in_cart, request.subscribed_ids = state or NO_USER_STATE
+    recipe.is_favorited = recipe.pk in favorited
+    recipe.is_in_shopping_cart = recipe.pk in in_cart
+    etag = RecipesViewSet(request=request).get_etag([recipe])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        tags, ingredients = await pool.gather(
+            (list, Tag.objects.filter(recipes=pk)),
+            (list, RecipeIngredient.objects.filter(
+                recipe_id=pk
+            ).select_related('ingredient')),
+        )
+        response = render(serialize_recipe(request, recipe, tags,
+                                           ingredients))
+    return RecipesViewSet.set_conditional_headers(response, etag)
+
+
+def async_endpoint(fast, fallback):
+    """
+    Асинхронное представление: GET-запросы обслуживает корутина fast, а
+    остальные методы, а также запросы, которые fast не обработала (вернула
+    None или не смогла аутентифицировать), - синхронное представление
+    fallback в пуле api.pool.
+    """
+    fallback = pool.pooled(fallback)
+
+    @functools.wraps(fallback)
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            try:
+                response = await fast(request, *args, **kwargs)
+            except exceptions.AuthenticationFailed:
+                response = None
+            if response is not None:
+                return response
+        return await fallback(request, *args, **kwargs)
+    return view
+
+
+FAST_PATHS = {
+    'tags-list': tag_list,
+    'tags-detail': tag_detail,
+    'ingredients-list': ingredient_list,
+    'ingredients-detail': ingredient_detail,
+    'recipes-list': recipe_list,
+    'recipes-detail': recipe_detail,
+}
+
+
+def async_urlpatterns(patterns):
+    """
+    Заменяет представления маршрутов асинхронными: для FAST_PATHS -
+    async_endpoint, для остальных - выполнение в пуле api.pool.
+    """
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_endpoint(FAST_PATHS[pattern.name], pattern.callback)
+            if pattern.name in FAST_PATHS else pool.pooled(pattern.callback),
+            pattern.default_args,
+            pattern.name
+        )
+        for pattern in patterns
+    ]
@@ -0,0 +1,80 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле первичного ключа, которое не обращается к базе при проверке
+    отдельного значения.
+
+    to_internal_value только приводит ключ к нужному типу, а объекты
+    загружаются одним запросом IN родителем: BulkManyRelatedField при
+    many=True или BulkRelatedListSerializer для вложенных сериализаторов.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        """Возвращает {pk: объект} для найденных ключей одним запросом."""
+        return self.get_queryset().in_bulk(set(pks))
+
+    def does_not_exist(self, pk):
+        return self.error_messages['does_not_exist'].format(pk_value=pk)
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Список ключей, объекты по которым загружаются одним запросом."""
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects = self.child_relation.resolve(pks)
+        missing = dict.fromkeys(pk for pk in pks if pk not in objects)
+        if missing:
+            raise serializers.ValidationError([
+                self.child_relation.does_not_exist(pk) for pk in missing
+            ], code='does_not_exist')
+        return [objects[pk] for pk in pks]
+
+
+class BulkRelatedListSerializer(serializers.ListSerializer):
+    """
+    Список вложенных объектов, в котором поля BulkPrimaryKeyRelatedField
+    всех элементов загружаются одним запросом на поле. Ошибки по всем
+    отсутствующим объектам возвращаются вместе.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        errors = [{} for _ in items]
+        for name, field in self.child.fields.items():
+            if (field.read_only
+                    or not isinstance(field, BulkPrimaryKeyRelatedField)):
+                continue
+            key = field.source
+            objects = field.resolve(item[key] for item in items
+                                    if key in item)
+            for item, error in zip(items, errors):
+                if key not in item:
+                    continue
+                if item[key] in objects:
+                    item[key] = objects[item[key]]
+                else:
+                    error[name] = [field.does_not_exist(item[key])]
+        if any(errors):
+            raise serializers.ValidationError(errors, code='does_not_exist')
+        return items
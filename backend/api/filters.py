@@ -1,23 +1,78 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from rest_framework.filters import SearchFilter
-from recipes.models import Recipe, Tag
+from rest_framework.filters import BaseFilterBackend
+from recipes.cache import tag_ids_by_slug
+from recipes.models import Recipe
+from recipes.search import ingredient_index
 from users.models import User
 
 
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids_by_slug()]
+
+
 class TagFilter(FilterSet):
-    """Фильтр для рецептов по тегам и авторам."""
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    """
+    Фильтр для рецептов по тегам, авторам и полнотекстовому поиску.
+
+    Теги проверяются по кэшированному соответствию slug -> id, а рецепты
+    отбираются подзапросом EXISTS к связующей таблице, без JOIN и
+    дубликатов при совпадении нескольких тегов.
+    """
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
     )
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author')
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        slug_ids = tag_ids_by_slug()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=[slug_ids[slug] for slug in value]
+            )
+        ))
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
 
-class IngredientSearchFilter(SearchFilter):
-    """Фильтр для ингредиентов по названию."""
+
+class IngredientSearchFilter(BaseFilterBackend):
+    """
+    Фильтр для ингредиентов по началу названия.
+
+    Поиск выполняется по индексу ingredient_index в памяти процесса, при
+    INGREDIENT_SEARCH_IN_MEMORY = False - запросом к базе. Без параметра
+    limit возвращаются все совпадения, с ним - не больше limit и не больше
+    INGREDIENT_SEARCH_LIMIT.
+    """
     search_param = 'name'
+    limit_param = 'limit'
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_param])
+        except (KeyError, ValueError):
+            return None
+        return max(0, min(limit, settings.INGREDIENT_SEARCH_LIMIT))
+
+    def filter_queryset(self, request, queryset, view):
+        name = request.query_params.get(self.search_param, '').strip()
+        if not name:
+            return queryset
+        limit = self.get_limit(request)
+        if not settings.INGREDIENT_SEARCH_IN_MEMORY:
+            return queryset.filter(
+                name__istartswith=name
+            ).order_by('name')[:limit]
+        ingredient_index.refresh()
+        return ingredient_index.search(name, limit)
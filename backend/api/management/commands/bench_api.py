@@ -0,0 +1,170 @@
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe
+from recipes.synthetic import busiest_user, percentile
+from users.models import User
+
+SAMPLE_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Замер задержки, количества SQL-запросов и пропускной '
+            'способности основных страниц API, результат выводится в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Количество замеров на страницу')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Количество запросов на прогрев')
+        parser.add_argument('--endpoint', action='append',
+                            help='Замерять только указанные страницы')
+        parser.add_argument('--base-url',
+                            help='Адрес запущенного сервера, например '
+                                 'http://127.0.0.1:8000; по умолчанию '
+                                 'запросы выполняются тестовым клиентом')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Количество параллельных запросов к '
+                                 '--base-url')
+        parser.add_argument('--output', help='Файл для записи результата')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.user = busiest_user()
+        if self.user is None:
+            raise CommandError(
+                'В базе нет данных, заполните ее командой generate_data'
+            )
+        endpoints = self.get_endpoints()
+        names = options['endpoint'] or list(endpoints)
+        unknown = set(names) - set(endpoints)
+        if unknown:
+            raise CommandError(f'Неизвестные страницы: {sorted(unknown)}')
+
+        if options['base_url']:
+            send = self.http_sender(options['base_url'])
+        else:
+            send = self.client_sender()
+        started_at = timezone.now()
+        results = {
+            name: self.measure(send, endpoints[name], options)
+            for name in names
+        }
+        report = json.dumps({
+            'started_at': started_at.isoformat(),
+            'database': connection.vendor,
+            'transport': 'http' if options['base_url'] else 'client',
+            'concurrency': options['concurrency'],
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'endpoints': results,
+        }, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report)
+        self.stdout.write(report)
+
+    def get_endpoints(self):
+        """Возвращает {страница: функция, возвращающая очередной адрес}."""
+        recipe_ids = list(Recipe.objects.order_by('?').values_list(
+            'id', flat=True
+        )[:SAMPLE_SIZE])
+        names = list(Ingredient.objects.order_by('?').values_list(
+            'name', flat=True
+        )[:SAMPLE_SIZE])
+        return {
+            'feed': lambda: '/api/recipes/',
+            'feed_page': lambda: (
+                f'/api/recipes/?page={self.random.randint(2, 20)}'
+            ),
+            'feed_favorites': lambda: '/api/recipes/?is_favorited=1',
+            'recipe_detail': lambda: (
+                f'/api/recipes/{self.random.choice(recipe_ids)}/'
+            ),
+            'subscriptions': lambda: (
+                '/api/users/subscriptions/?recipes_limit=3'
+            ),
+            'ingredient_search': lambda: '/api/ingredients/?' + urlencode({
+                'name': self.random.choice(names)[:self.random.randint(1, 4)]
+            }),
+            'shopping_cart': lambda: (
+                '/api/recipes/download_shopping_cart/'
+            ),
+        }
+
+    def client_sender(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def send(path):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(path)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            return response.status_code, len(queries)
+        return send
+
+    def http_sender(self, base_url):
+        token, _ = Token.objects.get_or_create(user=self.user)
+
+        def send(path):
+            request = Request(base_url.rstrip('/') + path, headers={
+                'Authorization': f'Token {token.key}'
+            })
+            try:
+                with urlopen(request) as response:
+                    response.read()
+                    return response.status, None
+            except HTTPError as error:
+                return error.code, None
+        return send
+
+    def measure(self, send, build_path, options):
+        for _ in range(options['warmup']):
+            send(build_path())
+        paths = [build_path() for _ in range(options['requests'])]
+
+        def timed(path):
+            start = time.perf_counter()
+            status, queries = send(path)
+            return (time.perf_counter() - start) * 1000, status, queries
+
+        concurrency = options['concurrency'] if options['base_url'] else 1
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                samples = list(executor.map(timed, paths))
+        else:
+            # Тестовый клиент работает в соединении текущего потока.
+            samples = [timed(path) for path in paths]
+        elapsed = time.perf_counter() - start
+
+        timings = sorted(sample[0] for sample in samples)
+        queries = [sample[2] for sample in samples if sample[2] is not None]
+        return {
+            'requests': len(samples),
+            'errors': sum(sample[1] >= 400 for sample in samples),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries_per_request': (
+                round(statistics.mean(queries), 2) if queries else None
+            ),
+            'max_queries': max(queries) if queries else None,
+            'throughput_rps': round(len(samples) / elapsed, 1),
+        }
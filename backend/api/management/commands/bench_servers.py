@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+GUNICORN = 'from gunicorn.app.wsgiapp import run; run()'
+# Режим запуска: (приложение, класс воркеров gunicorn, ASYNC_VIEWS).
+MODES = {
+    'sync': ('foodgram.wsgi:application', 'sync', False),
+    'async': ('foodgram.asgi:application',
+              'uvicorn.workers.UvicornWorker', True),
+}
+STARTUP_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пропускной способности синхронного (WSGI) и '
+            'асинхронного (ASGI) запуска при одинаковом числе воркеров, '
+            'результат выводится в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Количество воркеров gunicorn')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Количество параллельных запросов')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Количество замеров на страницу')
+        parser.add_argument('--endpoint', action='append',
+                            help='Замерять только указанные страницы')
+        parser.add_argument('--port', type=int, default=8700,
+                            help='Первый из портов для запуска серверов')
+        parser.add_argument('--output', help='Файл для записи результата')
+
+    def handle(self, *args, **options):
+        results = {}
+        for port, (mode, config) in enumerate(MODES.items(),
+                                              options['port']):
+            with self.server(port, options['workers'], *config) as base_url:
+                output = io.StringIO()
+                call_command('bench_api', base_url=base_url,
+                             concurrency=options['concurrency'],
+                             requests=options['requests'],
+                             endpoint=options['endpoint'], stdout=output)
+                results[mode] = json.loads(output.getvalue())['endpoints']
+        report = json.dumps({
+            'workers': options['workers'],
+            'concurrency': options['concurrency'],
+            'modes': results,
+            'throughput_ratio': {
+                name: round(results['async'][name]['throughput_rps']
+                            / results['sync'][name]['throughput_rps'], 2)
+                for name in results['sync']
+            },
+        }, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report)
+        self.stdout.write(report)
+
+    @contextmanager
+    def server(self, port, workers, application, worker_class, async_views):
+        """Запускает gunicorn и возвращает адрес после его готовности."""
+        base_url = f'http://127.0.0.1:{port}'
+        process = subprocess.Popen(
+            [sys.executable, '-c', GUNICORN, application,
+             '--workers', str(workers), '--worker-class', worker_class,
+             '--bind', f'127.0.0.1:{port}'],
+            env={**os.environ, 'ASYNC_VIEWS': str(async_views)},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            self.wait_ready(process, base_url)
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait()
+
+    @staticmethod
+    def wait_ready(process, base_url):
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(
+                    f'Сервер {base_url} завершился с кодом '
+                    f'{process.returncode}'
+                )
+            try:
+                with urlopen(f'{base_url}/api/tags/'):
+                    return
+            except (URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'Сервер {base_url} не запустился')
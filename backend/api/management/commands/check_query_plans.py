@@ -0,0 +1,211 @@
+import json
+
+from django.core.exceptions import EmptyResultSet
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import RecipeKeysetPagination
+from api.views import RecipesViewSet
+from recipes.cart import shopping_list
+from recipes.models import Recipe, RecipeIngredient, Tag
+from recipes.synthetic import SyntheticData, busiest_user
+from users.models import User
+
+PAGE_SIZE = 6
+
+
+def recipes(user, **params):
+    """Список рецептов в том виде, в каком его выбирает RecipesViewSet."""
+    request = Request(APIRequestFactory().get('/api/recipes/', params))
+    request.user = user
+    view = RecipesViewSet(request=request, action='list', format_kwarg=None,
+                          kwargs={})
+    queryset = view.filter_queryset(view.get_queryset())
+    return queryset.order_by(*RecipeKeysetPagination.ordering)
+
+
+def recipes_page(user, **params):
+    return recipes(user, **params)[:PAGE_SIZE]
+
+
+def next_recipes_page(user):
+    middle = Recipe.objects.order_by('-pub_date', '-id')[
+        Recipe.objects.count() // 2
+    ]
+    pagination = RecipeKeysetPagination()
+    position = {'pub_date': middle.pub_date, 'id': middle.id}
+    return recipes(user).filter(
+        pagination.get_position_filter(position)
+    )[:PAGE_SIZE]
+
+
+def subscriptions_feed(user):
+    return Recipe.objects.add_user_annotations(user.pk).with_related(
+    ).for_subscriber(user.pk).order_by(
+        *RecipeKeysetPagination.ordering
+    )[:PAGE_SIZE]
+
+
+def page_ingredients(user):
+    return RecipeIngredient.objects.filter(
+        recipe__in=list(recipes_page(user).values_list('id', flat=True))
+    ).select_related('ingredient')
+
+
+def subscriptions(user):
+    return User.objects.filter(
+        subscribed_to__subscriber=user
+    ).order_by('id')[:PAGE_SIZE]
+
+
+def subscription_recipes(user):
+    authors = list(subscriptions(user).values_list('id', flat=True))
+    return Recipe.objects.filter(author__in=authors).limit_per_author(3)
+
+
+HOT_QUERIES = {
+    'feed': recipes_page,
+    'feed_next_page': next_recipes_page,
+    'feed_ingredients': page_ingredients,
+    'feed_by_tag': lambda user: recipes_page(
+        user, tags=Tag.objects.values_list('slug', flat=True).first()
+    ),
+    'author_recipes': lambda user: recipes_page(
+        user, author=Recipe.objects.values_list('author', flat=True).first()
+    ),
+    'favorites_feed': lambda user: recipes_page(user, is_favorited=1),
+    'cart_feed': lambda user: recipes_page(user, is_in_shopping_cart=1),
+    'subscriptions_feed': subscriptions_feed,
+    'cart_export': shopping_list,
+    'subscriptions': subscriptions,
+    'subscription_recipes': subscription_recipes,
+}
+
+
+def walk(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk(child)
+
+
+class Command(BaseCommand):
+    help = ('Проверка планов запросов основных страниц API: завершается '
+            'ошибкой при последовательном чтении больших таблиц или росте '
+            'стоимости плана относительно сохраненного базового уровня')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Предварительно заполнить базу синтетическими данными'
+        )
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--recipes', type=int, default=50000)
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Таблицы меньшего размера можно читать последовательно'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON-файл с базовой стоимостью планов'
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Записать текущую стоимость планов в --baseline'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Допустимый относительный рост стоимости плана'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов требует PostgreSQL')
+        if options['seed']:
+            self.seed(options)
+        user = self.get_user()
+        large_tables = self.get_large_tables(options['min_rows'])
+
+        costs = {}
+        problems = []
+        for name, build in HOT_QUERIES.items():
+            plan = self.explain(build(user))
+            if plan is None:
+                continue
+            costs[name] = plan['Total Cost']
+            scans = sorted({
+                node['Relation Name'] for node in walk(plan)
+                if node['Node Type'] == 'Seq Scan'
+                and node['Relation Name'] in large_tables
+            })
+            if scans:
+                problems.append(
+                    f'{name}: последовательное чтение {", ".join(scans)}'
+                )
+            self.stdout.write(f'{name}: стоимость {costs[name]:.2f}')
+
+        if options['baseline']:
+            if options['update_baseline']:
+                with open(options['baseline'], 'w') as file:
+                    json.dump(costs, file, indent=2, sort_keys=True)
+            else:
+                problems.extend(self.compare(
+                    costs, options['baseline'], options['tolerance']
+                ))
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке'))
+
+    def seed(self, options):
+        data = SyntheticData(users=options['users'],
+                             recipes=options['recipes'])
+        if data.exists():
+            self.stdout.write('Синтетические данные уже загружены')
+        else:
+            self.stdout.write(f'Создано: {data.generate()}')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def get_user(self):
+        """Пользователь с наибольшим числом рецептов в избранном."""
+        user = busiest_user()
+        if user is None:
+            raise CommandError('В базе нет данных, запустите с --seed')
+        return user
+
+    def get_large_tables(self, min_rows):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class "
+                "WHERE relkind = 'r' AND reltuples >= %s",
+                [min_rows]
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def explain(self, queryset):
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def compare(self, costs, path, tolerance):
+        with open(path) as file:
+            baseline = json.load(file)
+        for name, cost in costs.items():
+            limit = baseline.get(name, cost) * (1 + tolerance)
+            if cost > limit:
+                yield (f'{name}: стоимость {cost:.2f} превышает базовую '
+                       f'{baseline[name]:.2f}')
@@ -0,0 +1,155 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+current_stats = ContextVar('current_stats', default=None)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def fingerprint(sql):
+    """
+    Приводит SQL к общему виду: литералы и списки параметров IN
+    заменяются на ?, чтобы однотипные запросы считались вместе.
+    """
+    sql = PLACEHOLDER_LISTS.sub('(?)', sql)
+    sql = LITERALS.sub('?', sql.replace('%s', '?'))
+    return ' '.join(sql.split())
+
+
+class RequestStats:
+    """
+    Счетчики одного запроса: SQL-запросы и время сериализации. SQL-запросы
+    асинхронных представлений могут выполняться параллельно в нескольких
+    потоках, поэтому их учет защищен блокировкой.
+    """
+
+    def __init__(self):
+        self.queries = Counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка для connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.query_time += duration
+                self.query_count += 1
+                self.queries[fingerprint(sql)] += 1
+
+
+class TimedSerializerMixin:
+    """
+    Учитывает время to_representation в статистике текущего запроса.
+    Вложенные сериализаторы не учитываются повторно.
+    """
+
+    def to_representation(self, instance):
+        stats = current_stats.get()
+        if stats is None or stats._serializer_depth:
+            return super().to_representation(instance)
+        stats._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+            stats._serializer_depth -= 1
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с накопительными корзинами."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted(
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            )
+        for key, counts, total in values:
+            labels = ','.join(
+                f'{label}="{value}"' for label, value in zip(self.labels, key)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+LABELS = ('view', 'action', 'method', 'status')
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = Histogram(
+    'api_request_duration_seconds', 'Полное время обработки запроса.',
+    LABELS, SECONDS
+)
+DB_QUERIES = Histogram(
+    'api_request_db_queries', 'Количество SQL-запросов на запрос.',
+    LABELS, (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+DB_DURATION = Histogram(
+    'api_request_db_duration_seconds', 'Время выполнения SQL-запросов.',
+    LABELS, SECONDS
+)
+SERIALIZER_DURATION = Histogram(
+    'api_request_serializer_duration_seconds', 'Время сериализации ответа.',
+    LABELS, SECONDS
+)
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes', 'Размер тела ответа.',
+    LABELS, (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+HISTOGRAMS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION,
+              SERIALIZER_DURATION, RESPONSE_SIZE)
+
+
+def metrics_view(request):
+    """
+    Отдает метрики процесса в текстовом формате Prometheus. Доступно
+    только с адресов METRICS_ALLOWED_IPS.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n',
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
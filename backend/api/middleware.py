@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import (DB_DURATION, DB_QUERIES, REQUEST_DURATION,
+                      RESPONSE_SIZE, SERIALIZER_DURATION, RequestStats,
+                      current_stats)
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_view(request):
+    """
+    Возвращает имя вьюсета и действие роутера для запроса. Для
+    представлений без действий действием считается HTTP-метод.
+    """
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved', request.method.lower()
+    view = getattr(match.func, 'cls', match.func)
+    actions = getattr(match.func, 'actions', None) or {}
+    return (getattr(view, '__name__', match.view_name),
+            actions.get(request.method.lower(), request.method.lower()))
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """
+    Собирает для каждого запроса время обработки, количество и время
+    SQL-запросов, время сериализации и размер ответа.
+
+    Значения попадают в гистограммы api.metrics с метками вьюсета и
+    действия, а в ответ добавляется заголовок Server-Timing (для
+    потоковых ответов - на момент отправки заголовков). Если запрос
+    превысил REQUEST_QUERY_BUDGET или REQUEST_TIME_BUDGET, в журнал
+    пишется предупреждение с самыми частыми отпечатками SQL.
+
+    При работе через ASGI middleware асинхронное: статистика передается
+    в потоки пула api.pool через контекстную переменную current_stats.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.process(request, response, stats, start)
+
+    async def acall(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.process(request, response, stats, start)
+
+    def process(self, request, response, stats, start):
+        duration = time.perf_counter() - start
+        view, action = resolve_view(request)
+        labels = {'view': view, 'action': action, 'method': request.method,
+                  'status': response.status_code}
+        response['Server-Timing'] = (
+            f'db;dur={stats.query_time * 1000:.1f};'
+            f'desc="{stats.query_count} queries", '
+            f'serializer;dur={stats.serializer_time * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, stats, start, labels
+            )
+        else:
+            self.finish(request, stats, duration, labels,
+                        len(response.content))
+        return response
+
+    def stream(self, content, request, stats, start, labels):
+        """
+        Учитывает SQL-запросы, выполняемые при отдаче потокового ответа,
+        и записывает метрики после отправки последней части.
+        """
+        size = 0
+        try:
+            with connection.execute_wrapper(stats):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+        finally:
+            self.finish(request, stats, time.perf_counter() - start, labels,
+                        size)
+
+    def finish(self, request, stats, duration, labels, size):
+        REQUEST_DURATION.observe(duration, **labels)
+        DB_QUERIES.observe(stats.query_count, **labels)
+        DB_DURATION.observe(stats.query_time, **labels)
+        SERIALIZER_DURATION.observe(stats.serializer_time, **labels)
+        RESPONSE_SIZE.observe(size, **labels)
+        if (stats.query_count > settings.REQUEST_QUERY_BUDGET
+                or duration > settings.REQUEST_TIME_BUDGET):
+            self.report(request, labels, stats, duration)
+
+    @staticmethod
+    def report(request, labels, stats, duration):
+        fingerprints = '\n'.join(
+            f'  {count} x {sql}'
+            for sql, count in stats.queries.most_common(5)
+        )
+        logger.warning(
+            'Превышен бюджет запроса %s %s (%s.%s): %.0f мс, '
+            '%d SQL-запросов за %.0f мс\n%s',
+            request.method, request.path, labels['view'], labels['action'],
+            duration * 1000, stats.query_count, stats.query_time * 1000,
+            fingerprints
+        )
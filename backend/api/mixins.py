@@ -0,0 +1,186 @@
+import hashlib
+import json
+
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+from .pagination import KeysetPagination
+
+
+class ReferenceCacheMixin:
+    """
+    Кэширует ответы list и retrieve справочного вьюсета в reference_cache
+    и отвечает 304 Not Modified на условные запросы по ETag и
+    Last-Modified.
+    """
+    reference_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self, request, **kwargs):
+        return self.reference_cache_key(
+            self.action, kwargs.get(self.lookup_field, ''),
+            request.query_params
+        )
+
+    @staticmethod
+    def reference_cache_key(action, pk, params):
+        params = urlencode(sorted(params.lists()), doseq=True)
+        return f'{action}:{pk}:{params}'
+
+    @staticmethod
+    def reference_validators(version, key):
+        """Возвращает ETag и Last-Modified ответа для версии справочника."""
+        etag = quote_etag(
+            hashlib.md5(f'{version}:{key}'.encode()).hexdigest()
+        )
+        return etag, int(version)
+
+    @staticmethod
+    def set_reference_headers(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version = self.reference_cache.version()
+        key = self.get_cache_key(request, **kwargs)
+        etag, last_modified = self.reference_validators(version, key)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            data = self.reference_cache.get(key, version)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                self.reference_cache.set(key, data, version)
+            response = Response(data)
+        return self.set_reference_headers(response, etag, last_modified)
+
+
+class ConditionalResponseMixin:
+    """
+    Отвечает 304 Not Modified на условные запросы list и retrieve до
+    загрузки связанных объектов и сериализации.
+
+    Слабый ETag строится по get_etag_values() объектов ответа и по
+    служебным полям пагинации (количество, ссылки). Связи из
+    prefetch_related запроса загружаются только если ответ нужно
+    сериализовать.
+    """
+
+    def get_etag_values(self, obj):
+        """
+        Значения объекта, от которых зависит его представление. По
+        умолчанию - ключ и время изменения (updated_at); вьюсеты, в ответ
+        которых входят связанные объекты или состояние пользователя,
+        дополняют их.
+        """
+        return (obj.pk, obj.updated_at)
+
+    def get_etag(self, objects, envelope=None):
+        return self.make_etag(
+            [envelope, [self.get_etag_values(obj) for obj in objects]]
+        )
+
+    @staticmethod
+    def make_etag(values):
+        payload = json.dumps(values, default=str)
+        return f'W/"{hashlib.md5(payload.encode()).hexdigest()}"'
+
+    def conditional_response(self, request, etag, render):
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = render()
+        return self.set_conditional_headers(response, etag)
+
+    @staticmethod
+    def set_conditional_headers(response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_list(
+            request, self.filter_queryset(self.get_queryset())
+        )
+
+    def conditional_list(self, request, queryset):
+        lookups = queryset._prefetch_related_lookups
+        queryset = queryset.prefetch_related(None)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            objects, envelope = list(queryset), None
+        else:
+            objects = page
+            envelope = self.get_paginated_response([]).data
+
+        def render():
+            prefetch_related_objects(objects, *lookups)
+            data = self.get_serializer(objects, many=True).data
+            if page is None:
+                return Response(data)
+            return self.get_paginated_response(data)
+
+        return self.conditional_response(
+            request, self.get_etag(objects, envelope), render
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookups = queryset._prefetch_related_lookups
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+            queryset.prefetch_related(None),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, instance)
+
+        def render():
+            prefetch_related_objects([instance], *lookups)
+            return Response(self.get_serializer(instance).data)
+
+        return self.conditional_response(
+            request, self.get_etag([instance]), render
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Включает постраничный вывод keyset_pagination_class, если клиент
+    передал pagination=cursor или курсор. Без параметров используется
+    обычная постраничная навигация. Действия, у которых pagination_class
+    уже постраничный по ключу, используют его.
+    """
+    keyset_pagination_class = None
+
+    def use_keyset_pagination(self):
+        params = self.request.query_params
+        return (self.keyset_pagination_class is not None
+                and (params.get('pagination') == 'cursor'
+                     or self.keyset_pagination_class.cursor_query_param
+                     in params))
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and not issubclass(self.pagination_class or object,
+                                   KeysetPagination)
+                and self.use_keyset_pagination()):
+            self._paginator = self.keyset_pagination_class()
+        return super().paginator
@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.feed import recent_recipes
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу (keyset).
+
+    Курсор хранит значения полей ordering последнего объекта страницы,
+    следующая страница выбирается условием "после курсора" без OFFSET.
+    Порядок стабилен при одновременном добавлении объектов, если последнее
+    поле ordering уникально. Общее количество объектов считается только
+    по запросу с параметром count=true.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset)
+        page = self.get_page(queryset, position)
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_ordering(self, queryset):
+        """Поля, по которым упорядочены страницы queryset."""
+        return self.ordering
+
+    def get_page(self, queryset, position):
+        """Возвращает до page_size + 1 объектов после позиции position."""
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        return list(queryset[:self.page_size + 1])
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_position_filter(self, position):
+        """
+        Строит условие "после курсора": для ordering (a, b) и курсора
+        (x, y) это a <= x AND (a < x OR (a = x AND b < y)) для убывания.
+        Первое условие позволяет базе использовать индекс по (a, b).
+        """
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): position[previous.lstrip('-')]
+                for previous in self.ordering[:index]
+            }
+            conditions.append(Q(**equal, **{
+                f'{name}__{lookup}': position[name]
+            }))
+        first = self.ordering[0].lstrip('-')
+        bound = 'lte' if self.ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{first}__{bound}': position[first]}) & reduce(
+            or_, conditions
+        )
+
+    def encode_cursor(self, obj):
+        position = {}
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = getattr(obj, name)
+            position[name] = (value.isoformat() if hasattr(value, 'isoformat')
+                              else value)
+        return base64.urlsafe_b64encode(
+            json.dumps(position).encode()
+        ).decode()
+
+    @staticmethod
+    def get_field(queryset, name):
+        """Поле модели или аннотации queryset с именем name."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = {
+                field.lstrip('-'): self.get_field(
+                    queryset, field.lstrip('-')
+                ).to_python(position[field.lstrip('-')])
+                for field in self.ordering
+            }
+        except (binascii.Error, ValueError, TypeError, KeyError,
+                ValidationError) as error:
+            raise NotFound(self.invalid_cursor_message) from error
+        if None in position.values():
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class RecipeKeysetPagination(KeysetPagination):
+    """
+    Постраничный вывод рецептов по ключу (pub_date, id). Результаты
+    полнотекстового поиска (RecipeQuerySet.search) упорядочены по
+    релевантности, поэтому их ключ - (rank, pub_date, id).
+    """
+    ordering = ('-pub_date', '-id')
+    search_ordering = ('-rank', '-pub_date', '-id')
+
+    def get_ordering(self, queryset):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return self.ordering
+
+
+class SubscriptionKeysetPagination(KeysetPagination):
+    """Постраничный вывод подписок по ключу id."""
+    ordering = ('id',)
+
+
+class FeedKeysetPagination(RecipeKeysetPagination):
+    """
+    Постраничный вывод ленты подписок.
+
+    Страницы, попадающие в кэшированное окно ленты пользователя
+    (recipes.feed.recent_recipes), выбираются по id из окна; дальше окна
+    используется обычный запрос по ключу.
+    """
+
+    def get_page(self, queryset, position):
+        entries, complete = recent_recipes(self.request.user.pk)
+        if position is not None:
+            key = (position['pub_date'], position['id'])
+            entries = [entry for entry in entries if entry < key]
+        ids = [pk for _, pk in entries[:self.page_size + 1]]
+        if len(ids) <= self.page_size and not complete:
+            return super().get_page(queryset, position)
+        objects = queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
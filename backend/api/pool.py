@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+
+from .metrics import current_stats
+
+# ORM Django 3.2 синхронный, поэтому запросы асинхронных представлений
+# выполняются в потоках пула. У каждого потока свое соединение с базой,
+# которое живет DB_CONN_MAX_AGE секунд, так что пул ограничивает и
+# переиспользует DB_POOL_SIZE соединений процесса. Пул создается при
+# первом обращении, а не при импорте.
+_executor = None
+_executor_lock = threading.Lock()
+# Соединения потоков пула, закрываемые при его остановке.
+_connections = []
+
+
+def register_connections():
+    with _executor_lock:
+        _connections.extend(connections.all())
+
+
+def get_executor():
+    """Возвращает пул потоков, создавая его при первом вызове."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DB_POOL_SIZE,
+                thread_name_prefix='db-pool',
+                initializer=register_connections
+            )
+        return _executor
+
+
+def shutdown():
+    """
+    Останавливает пул, дожидается завершения его потоков и закрывает их
+    соединения с базой. Следующий вызов run создаст новый пул.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is None:
+        return
+    executor.shutdown(wait=True)
+    with _executor_lock:
+        closing = _connections[:]
+        del _connections[:]
+    for wrapper in closing:
+        # Потоки пула завершены, соединение закрывает текущий поток.
+        wrapper.inc_thread_sharing()
+        try:
+            wrapper.close()
+        finally:
+            wrapper.dec_thread_sharing()
+
+
+def call(func, *args, **kwargs):
+    close_old_connections()
+    stats = current_stats.get()
+    if stats is None:
+        return func(*args, **kwargs)
+    with connection.execute_wrapper(stats):
+        return func(*args, **kwargs)
+
+
+async def run(func, *args, **kwargs):
+    """
+    Выполняет синхронную функцию в пуле и возвращает ее результат.
+    Контекстные переменные (статистика запроса) передаются в поток.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(),
+        functools.partial(context.run, call, func, *args, **kwargs)
+    )
+
+
+async def gather(*calls):
+    """
+    Выполняет независимые вызовы (функция, *аргументы) параллельно и
+    возвращает их результаты в том же порядке.
+    """
+    return await asyncio.gather(*(run(*call) for call in calls))
+
+
+def pooled(view):
+    """
+    Асинхронная обертка синхронного представления: оно целиком
+    выполняется в потоке пула. Потоковый ответ вычитывается там же, так
+    как Django 3.2 отдает его в потоке цикла событий, где обращения к
+    базе запрещены.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await run(view, request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = await run(
+                list, response.streaming_content
+            )
+        return response
+    return wrapper
@@ -0,0 +1,144 @@
+import csv
+import io
+import json
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+PDF_FONT = 'DejaVuSans'
+PDF_CHUNK_SIZE = 64 * 1024
+_font_lock = threading.Lock()
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(BaseRenderer, ABC):
+    """
+    Базовый рендерер списка покупок.
+
+    Наследники реализуют генератор stream(), чтобы ответ можно было
+    передавать через StreamingHttpResponse, не собирая его целиком в памяти.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return json.dumps(data, ensure_ascii=False).encode(self.charset)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    @abstractmethod
+    def stream(self, items):
+        """Возвращает итератор частей ответа для строк списка items."""
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    """Список покупок в виде текстового файла."""
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        for item in items:
+            yield (f"* {item['name']} ({item['measurement_unit']}) "
+                   f"— {item['amount']}\n")
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    """Список покупок в формате CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in items:
+            yield writer.writerow((item['name'],
+                                   item['measurement_unit'],
+                                   item['amount']))
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRenderer):
+    """Список покупок в виде JSON-массива."""
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, items):
+        separator = '['
+        for item in items:
+            yield separator + json.dumps({
+                'name': item['name'],
+                'measurement_unit': item['measurement_unit'],
+                'amount': item['amount'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    """
+    Список покупок в формате PDF.
+
+    Кириллица выводится шрифтом SHOPPING_CART_PDF_FONT (DejaVu Sans из
+    системного пакета fonts-dejavu-core), который встраивается в документ.
+    Строки списка читаются из итератора по одной и рисуются постранично,
+    готовый документ отдается частями по PDF_CHUNK_SIZE байт.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+    title = 'Список покупок'
+    font_size = 12
+    title_size = 16
+    line_height = 18
+    margin = 50
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return b''.join(self.stream(data))
+
+    @staticmethod
+    def register_font():
+        with _font_lock:
+            if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(
+                    TTFont(PDF_FONT, settings.SHOPPING_CART_PDF_FONT)
+                )
+
+    def stream(self, items):
+        self.register_font()
+        buffer = io.BytesIO()
+        width, height = A4
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setTitle(self.title)
+        pdf.setFont(PDF_FONT, self.title_size)
+        top = height - self.margin
+        pdf.drawString(self.margin, top, self.title)
+        y = top - 2 * self.line_height
+        pdf.setFont(PDF_FONT, self.font_size)
+        for item in items:
+            text = (f"• {item['name']} ({item['measurement_unit']}) "
+                    f"— {item['amount']}")
+            for line in simpleSplit(text, PDF_FONT, self.font_size,
+                                    width - 2 * self.margin):
+                if y < self.margin:
+                    pdf.showPage()
+                    pdf.setFont(PDF_FONT, self.font_size)
+                    y = top
+                pdf.drawString(self.margin, y, line)
+                y -= self.line_height
+        pdf.save()
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
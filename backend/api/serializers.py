@@ -1,13 +1,36 @@
-import base64
+from collections import defaultdict
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
-from users.models import User, Subscription
+from users.models import User
+from recipes import cart
+from recipes.images import PendingImage, schedule_recipe_image
 from recipes.models import Tag, Ingredient, RecipeIngredient, Recipe
+from recipes.user_lists import subscriptions
 
+from .fields import BulkPrimaryKeyRelatedField, BulkRelatedListSerializer
+from .metrics import TimedSerializerMixin
 
-class CustomUserSerializer(UserSerializer):
+
+def get_subscribed_ids(request):
+    """
+    Возвращает множество id авторов, на которых подписан пользователь
+    запроса. Берется из кэша подписок пользователя и запоминается в
+    request, поэтому все сериализаторы в рамках запроса используют общий
+    результат.
+    """
+    if not hasattr(request, 'subscribed_ids'):
+        user = request.user
+        request.subscribed_ids = (
+            subscriptions.ids(user.pk) if user.is_authenticated
+            else frozenset()
+        )
+    return request.subscribed_ids
+
+
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     """Сериализатор для пользователей, с дополнительным полем is_subscribed."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -18,9 +41,7 @@ class CustomUserSerializer(UserSerializer):
                   'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return (user.is_authenticated
-                and obj.subscribed_to.filter(subscriber=user).exists())
+        return obj.pk in get_subscribed_ids(self.context['request'])
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -32,15 +53,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
                   'password')
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
-    """Сериализатор для модели Subscription."""
-    class Meta:
-        model = Subscription
-        fields = ('subscriber', 'subscribed_to')
-        read_only_fields = ('subscriber', 'subscribed_to')
-
-
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Tag."""
     class Meta:
         model = Tag
@@ -48,7 +61,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('name', 'color', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Ingredient."""
     class Meta:
         model = Ingredient
@@ -75,53 +88,80 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
-    """Поле для загрузки изображений в формате Base64."""
+    """
+    Поле для загрузки изображений в формате Base64.
+
+    Возвращает PendingImage: изображение сохраняется во временный файл и
+    обрабатывается в фоне после сохранения рецепта.
+    """
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-
-        return super().to_internal_value(data)
+            imgstr = data.partition(';base64,')[2]
+            self.pending = PendingImage.from_base64(imgstr)
+        else:
+            self.pending = PendingImage.from_file(
+                super().to_internal_value(data)
+            )
+        return self.pending
 
 
-class UserRecipeSerializer(serializers.ModelSerializer):
+class UserRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Recipe, используемый в контексте пользователя.
     """
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
-        read_only_fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_small', 'image_medium',
+                  'cooking_time')
+        read_only_fields = ('id', 'name', 'image', 'image_small',
+                            'image_medium', 'cooking_time')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BULK_LIMIT
+    )
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class AuthorIdsSerializer(serializers.Serializer):
+    """Список id авторов для массовой подписки и отписки."""
+    authors = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.SUBSCRIBE_BULK_LIMIT
+    )
+
+
+class RecipeListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для списка рецептов."""
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
-    ingredients = serializers.SerializerMethodField()
+    ingredients = RecipeIngredientSerializer(
+        source='recipeingredient_set',
+        many=True,
+        read_only=True
+    )
     is_favorited = serializers.BooleanField()
     is_in_shopping_cart = serializers.BooleanField()
     image = Base64ImageField()
-
-    def get_ingredients(self, obj):
-        """Возвращает отдельный сериализатор."""
-        return RecipeIngredientSerializer(
-            RecipeIngredient.objects.filter(recipe=obj).all(), many=True
-        ).data
+    image_small = serializers.ImageField(read_only=True)
+    image_medium = serializers.ImageField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_small', 'image_medium',
+                  'text', 'cooking_time')
 
 
 class IngredientCreateInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для ингредиентов в рецепте."""
     recipe = serializers.PrimaryKeyRelatedField(read_only=True)
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         source='ingredient',
         queryset=Ingredient.objects.all()
     )
@@ -134,29 +174,61 @@ class IngredientCreateInRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('recipe', 'id', 'amount')
+        list_serializer_class = BulkRelatedListSerializer
 
 
-class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
+class RecipeCreateUpdateSerializer(TimedSerializerMixin,
+                                   serializers.ModelSerializer):
     """Сериализатор для создания и обновления рецепта."""
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
     ingredients = IngredientCreateInRecipeSerializer(many=True)
     image = Base64ImageField(required=True)
 
+    def run_validation(self, data=serializers.empty):
+        """Удаляет временный файл изображения, если данные не прошли
+        проверку."""
+        try:
+            return super().run_validation(data)
+        except serializers.ValidationError:
+            self.discard_image()
+            raise
+
+    def save(self, **kwargs):
+        """Удаляет временный файл изображения, если транзакция сохранения
+        откатилась."""
+        try:
+            return super().save(**kwargs)
+        except Exception:
+            self.discard_image()
+            raise
+
+    def discard_image(self):
+        pending = getattr(self.fields['image'], 'pending', None)
+        if pending is not None:
+            pending.discard()
+
     def validate_ingredients(self, value):
         if len(value) < 1:
             raise serializers.ValidationError(
                 "Добавьте хотя бы один ингредиент.")
+        ids = [item['ingredient'].pk for item in value]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError(
+                "Ингредиенты в рецепте не должны повторяться.")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        image = validated_data.pop('image')
         recipe = Recipe.objects.create(**validated_data)
+        schedule_recipe_image(recipe, image)
         recipe.tags.set(tags)
-        create_ingredients = [
+        self.ingredient_rows = [
             RecipeIngredient(
                 recipe=recipe,
                 ingredient=ingredient['ingredient'],
@@ -164,38 +236,79 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
             for ingredient in ingredients
         ]
-        RecipeIngredient.objects.bulk_create(
-            create_ingredients
-        )
+        RecipeIngredient.objects.bulk_create(self.ingredient_rows)
+        Recipe.objects.filter(pk=recipe.pk).update_search_vector()
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
+        tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
-        if tags:
-            instance.tags.clear()
+        image = validated_data.pop('image', None)
+        if image is not None:
+            schedule_recipe_image(instance, image)
+        if tags is not None:
             instance.tags.set(tags)
+        search_changed = any(
+            getattr(instance, field) != validated_data[field]
+            for field in ('name', 'text') if field in validated_data
+        )
         if ingredients is not None:
-            instance.ingredients.clear()
-
-            create_ingredients = [
-                RecipeIngredient(
-                    recipe=instance,
-                    ingredient=ingredient['ingredient'],
-                    amount=ingredient['amount']
-                )
-                for ingredient in ingredients
-            ]
-            RecipeIngredient.objects.bulk_create(
-                create_ingredients
-            )
-        return super().update(instance, validated_data)
+            search_changed |= self.update_ingredients(instance, ingredients)
+        recipe = super().update(instance, validated_data)
+        if search_changed:
+            Recipe.objects.filter(pk=recipe.pk).update_search_vector()
+        return recipe
+
+    def update_ingredients(self, recipe, ingredients):
+        """
+        Приводит ингредиенты рецепта к ingredients: добавляет новые строки,
+        меняет количество у изменившихся и удаляет лишние. Изменения
+        переносятся в списки покупок, содержащие рецепт. Возвращает True,
+        если изменился состав ингредиентов.
+        """
+        existing, removed = {}, []
+        for row in recipe.recipeingredient_set.all():
+            if row.ingredient_id in existing:
+                removed.append(row)
+            else:
+                existing[row.ingredient_id] = row
+        rows, created, changed = [], [], []
+        deltas = defaultdict(int)
+        for item in ingredients:
+            row = existing.pop(item['ingredient'].pk, None)
+            if row is None:
+                row = RecipeIngredient(recipe=recipe, amount=item['amount'])
+                created.append(row)
+            elif row.amount != item['amount']:
+                deltas[row.ingredient_id] -= row.amount
+                row.amount = item['amount']
+                changed.append(row)
+            row.ingredient = item['ingredient']
+            rows.append(row)
+        removed.extend(existing.values())
+        for row in removed:
+            deltas[row.ingredient_id] -= row.amount
+        for row in created + changed:
+            deltas[row.ingredient_id] += row.amount
+        if removed:
+            RecipeIngredient.objects.filter(
+                pk__in=[row.pk for row in removed]
+            ).delete()
+        RecipeIngredient.objects.bulk_create(created)
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        cart.change_recipe(recipe.pk, deltas)
+        self.ingredient_rows = rows
+        return bool(created or removed)
 
     def to_representation(self, obj):
         self.fields.pop('ingredients')
         representation = super().to_representation(obj)
+        rows = getattr(self, 'ingredient_rows', None)
+        if rows is None:
+            rows = obj.recipeingredient_set.select_related('ingredient')
         representation['ingredients'] = RecipeIngredientSerializer(
-            RecipeIngredient.objects.filter(recipe=obj).all(), many=True
+            rows, many=True
         ).data
         return representation
 
@@ -205,7 +318,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                   'name', 'text', 'cooking_time')
 
 
-class UserSubscribeSerializer(UserSerializer):
+class UserSubscribeSerializer(TimedSerializerMixin, UserSerializer):
     """
     Сериализатор для пользователей, отображающий их подписки и количество
     рецептов.
@@ -225,4 +338,4 @@ class UserSubscribeSerializer(UserSerializer):
         return True
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
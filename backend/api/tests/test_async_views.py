@@ -0,0 +1,150 @@
+import importlib
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+
+from api import pool
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def reload_urls():
+    for name in ('api.urls', 'foodgram.urls'):
+        importlib.reload(importlib.import_module(name))
+    clear_url_caches()
+
+
+@contextmanager
+def async_views():
+    """Подключает асинхронные маршруты, как при ASYNC_VIEWS = True."""
+    try:
+        with override_settings(ASYNC_VIEWS=True):
+            reload_urls()
+            yield
+    finally:
+        pool.shutdown()
+        reload_urls()
+
+
+@async_to_sync
+async def async_get(paths, **headers):
+    # AsyncClient Django 3.2 передает именованные аргументы заголовками
+    # как есть, поэтому HTTP_IF_NONE_MATCH превращается в if-none-match.
+    headers = {
+        name[len('HTTP_'):].replace('_', '-'): value
+        for name, value in headers.items()
+    }
+    client = AsyncClient()
+    return {path: await client.get(path, **headers) for path in paths}
+
+
+class AsyncViewsTest(TransactionTestCase):
+    """
+    Асинхронные представления отвечают так же, как синхронные. Запросы к
+    базе выполняются в потоках api.pool со своими соединениями, поэтому
+    данные теста фиксируются в базе.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author, self.reader = [
+            User.objects.create(username=name, email=f'{name}@example.com',
+                                first_name=name, last_name=name)
+            for name in ('author', 'reader')
+        ]
+        self.auth = {'HTTP_AUTHORIZATION': 'Token ' + Token.objects.create(
+            user=self.reader
+        ).key}
+        tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        Ingredient.objects.create(name='сахар', measurement_unit='г')
+        recipes = [
+            Recipe.objects.create(author=self.author, name=f'Суп {index}',
+                                  text='Текст', cooking_time=30)
+            for index in range(7)
+        ]
+        for recipe in recipes:
+            recipe.tags.set([tag])
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=salt,
+                                            amount=5)
+        self.client.post(f'/api/recipes/{recipes[0].pk}/favorite/',
+                         **self.auth)
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/',
+                         **self.auth)
+        self.paths = [
+            '/api/recipes/', '/api/recipes/?page=2',
+            f'/api/recipes/{recipes[0].pk}/', '/api/tags/',
+            f'/api/tags/{tag.pk}/', '/api/ingredients/',
+            '/api/ingredients/?name=со', f'/api/ingredients/{salt.pk}/',
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def sync_get(self, paths, **headers):
+        return {path: self.client.get(path, **headers) for path in paths}
+
+    def compare(self, paths, etag=True, clear_cache=False, **headers):
+        """
+        Сравнивает ответы синхронных и асинхронных маршрутов. При
+        clear_cache асинхронные запросы выполняются с пустым кэшем, и
+        ETag по новой версии кэша отличается.
+        """
+        expected = self.sync_get(paths, **headers)
+        if clear_cache:
+            cache.clear()
+        with async_views():
+            actual = async_get(paths, **headers)
+        for path, response in expected.items():
+            with self.subTest(path=path, **headers):
+                self.assertEqual(actual[path].status_code,
+                                 response.status_code)
+                self.assertEqual(actual[path].content, response.content)
+                if etag:
+                    self.assertEqual(actual[path].get('ETag'),
+                                     response.get('ETag'))
+        return expected
+
+    def test_same_responses(self):
+        for headers in ({}, self.auth):
+            responses = self.compare(self.paths, **headers)
+            for path, response in responses.items():
+                with self.subTest(path=path):
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(response.has_header('ETag'))
+
+    def test_not_modified(self):
+        for headers in ({}, self.auth):
+            etags = {
+                path: response['ETag']
+                for path, response in self.sync_get(
+                    self.paths, **headers
+                ).items()
+            }
+            with async_views():
+                for path, etag in etags.items():
+                    response = async_get(
+                        [path], HTTP_IF_NONE_MATCH=etag, **headers
+                    )[path]
+                    with self.subTest(path=path, **headers):
+                        self.assertEqual(response.status_code, 304)
+                        self.assertEqual(response['ETag'], etag)
+
+    def test_cache_miss(self):
+        for headers in ({}, self.auth):
+            self.compare(self.paths, etag=False, clear_cache=True, **headers)
+
+    def test_fallback(self):
+        # Кэш заполнен, но запрос с неверным токеном отклоняется, как в DRF.
+        self.sync_get(self.paths)
+        responses = self.compare(
+            self.paths[:4] + ['/api/recipes/999999/', '/api/tags/999999/'],
+            HTTP_AUTHORIZATION='Token invalid'
+        )
+        self.assertEqual(responses['/api/recipes/'].status_code, 401)
+        self.compare(['/api/recipes/999999/', '/api/recipes/?is_favorited=1'],
+                     **self.auth)
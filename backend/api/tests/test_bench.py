@@ -0,0 +1,58 @@
+import io
+import json
+import random
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from api.management.commands.bench_api import Command
+from recipes.models import Favorite, Ingredient, Recipe
+from recipes.synthetic import percentile
+from users.models import User
+
+
+class BenchApiEndpointsTest(TestCase):
+    """Адреса страниц, которые замеряет bench_api."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='капуста белокочанная',
+                                  measurement_unit='г')
+        user = User.objects.create(username='cook', email='cook@example.com',
+                                   first_name='Повар', last_name='Повар')
+        recipe = Recipe.objects.create(author=user, name='Щи', text='Текст',
+                                       cooking_time=60)
+        Favorite.objects.create(user=user, recipe=recipe)
+
+    def test_ingredient_search_is_encoded(self):
+        command = Command()
+        command.random = random.Random(42)
+        build_path = command.get_endpoints()['ingredient_search']
+        for _ in range(20):
+            path = build_path()
+            # urlopen отправляет адрес в ASCII.
+            path.encode('ascii')
+            name = parse_qs(urlparse(path).query)['name'][0]
+            self.assertTrue('капуста белокочанная'.startswith(name))
+
+    def test_single_request(self):
+        out = io.StringIO()
+        call_command('bench_api', requests=1, warmup=0,
+                     endpoint=['feed', 'recipe_detail'], stdout=out)
+        for result in json.loads(out.getvalue())['endpoints'].values():
+            self.assertEqual(result['requests'], 1)
+            self.assertEqual(result['errors'], 0)
+            self.assertEqual(result['p50_ms'], result['p99_ms'])
+
+
+class PercentileTest(SimpleTestCase):
+    """Перцентили по методу ближайшего ранга."""
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7.5], 99), 7.5)
+        self.assertEqual(percentile([1, 2, 3], 50), 2)
@@ -0,0 +1,54 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from api.mixins import ConditionalResponseMixin
+from recipes.models import Recipe
+from users.models import User
+
+
+class RecipeNameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Recipe
+        fields = ('id', 'name')
+
+
+class RecipeNameViewSet(ConditionalResponseMixin, ReadOnlyModelViewSet):
+    queryset = Recipe.objects.order_by('id')
+    serializer_class = RecipeNameSerializer
+
+
+class DefaultEtagTest(TestCase):
+    """ETag по умолчанию строится по ключу и времени изменения."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author',
+                                     email='author@example.com',
+                                     first_name='Автор', last_name='Автор')
+        cls.recipe = Recipe.objects.create(author=author, name='Суп',
+                                           text='Текст', cooking_time=30)
+
+    def get(self, action, **headers):
+        view = RecipeNameViewSet.as_view({'get': action})
+        request = APIRequestFactory().get('/', **headers)
+        if action == 'retrieve':
+            return view(request, pk=self.recipe.pk)
+        return view(request)
+
+    def test_etag(self):
+        for action in ('list', 'retrieve'):
+            with self.subTest(action=action):
+                response = self.get(action)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                response = self.get(action, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                Recipe.objects.filter(pk=self.recipe.pk).update(
+                    updated_at=timezone.now()
+                )
+                response = self.get(action, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,38 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient
+
+URL = '/api/ingredients/'
+
+
+class IngredientSearchTest(TestCase):
+    """Поиск ингредиентов по началу названия."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'соль {index:03}', measurement_unit='г')
+            for index in range(120)
+        ] + [Ingredient(name='сахар', measurement_unit='г')])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assert_found(self, params, expected):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), expected)
+
+    def check_limits(self):
+        self.assert_found({'name': 'сол'}, 120)
+        self.assert_found({'name': 'сол', 'limit': 5}, 5)
+        self.assert_found({'name': 'сол', 'limit': 1000}, 100)
+        self.assert_found({'name': 'Сах'}, 1)
+
+    def test_in_memory(self):
+        self.check_limits()
+
+    @override_settings(INGREDIENT_SEARCH_IN_MEMORY=False)
+    def test_database(self):
+        self.check_limits()
@@ -0,0 +1,94 @@
+import base64
+import json
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Subscription, User
+
+URLS = ('/api/recipes/', '/api/recipes/feed/', '/api/users/subscriptions/')
+
+
+def cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class KeysetPaginationTest(TestCase):
+    """Постраничный вывод по ключу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, author = [
+            User.objects.create(username=name, email=f'{name}@example.com',
+                                first_name=name, last_name=name)
+            for name in ('reader', 'author')
+        ]
+        Subscription.objects.create(subscriber=cls.user, subscribed_to=author)
+        for index in range(3):
+            Recipe.objects.create(author=author, name=f'Рецепт {index}',
+                                  text='Текст', cooking_time=10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages(self):
+        for url in URLS:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, {'pagination': 'cursor', 'limit': 1}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), 1)
+
+    def test_search_keeps_relevance_order(self):
+        author = User.objects.get(username='author')
+        for name, text in (('Каша', 'Борщ'), ('Борщ', 'Борщ борщ'),
+                           ('Суп', 'Борщ'), ('Борщ', 'Текст'),
+                           ('Борщ красный', 'Текст')):
+            Recipe.objects.create(author=author, name=name, text=text,
+                                  cooking_time=10)
+        Recipe.objects.update_search_vector()
+        expected = [
+            recipe['id'] for recipe in
+            self.client.get('/api/recipes/', {'search': 'борщ'}).data[
+                'results'
+            ]
+        ]
+        self.assertEqual(len(expected), 5)
+        found = []
+        params = {'search': 'борщ', 'pagination': 'cursor', 'limit': 2}
+        while True:
+            response = self.client.get('/api/recipes/', params)
+            self.assertEqual(response.status_code, 200)
+            found += [recipe['id'] for recipe in response.data['results']]
+            if response.data['next'] is None:
+                break
+            params['cursor'] = parse_qs(
+                urlparse(response.data['next']).query
+            )['cursor'][0]
+        self.assertEqual(found, expected)
+
+    def test_invalid_cursor(self):
+        cursors = (
+            'not-base64!',
+            cursor([]),
+            cursor({}),
+            cursor({'pub_date': '2024-01-01T00:00:00+00:00', 'id': 'x'}),
+            cursor({'pub_date': None, 'id': None}),
+        )
+        recipe_cursors = (
+            cursor({'pub_date': 'garbage', 'id': 1}),
+            cursor({'id': 1}),
+        )
+        for url in URLS:
+            if url.startswith('/api/recipes/'):
+                values = cursors + recipe_cursors
+            else:
+                values = cursors
+            for value in values:
+                with self.subTest(url=url, cursor=value):
+                    response = self.client.get(url, {'cursor': value})
+                    self.assertEqual(response.status_code, 404)
@@ -0,0 +1,118 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (Cart, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, Tag)
+from users.models import Subscription, User
+
+RECIPES = 8
+LOCAL_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class RecipeQueriesTest(TestCase):
+    """
+    Число запросов к базе для списка и просмотра рецептов не зависит от
+    количества рецептов на странице. Общий кэш очищается перед каждым
+    запросом, поэтому считаются запросы при промахе кэша; сам кэш
+    локальный, чтобы обращения к DatabaseCache не попадали в подсчет.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Читатель'
+        )
+        authors = [
+            User.objects.create(
+                username=f'author{index}', email=f'author{index}@example.com',
+                first_name='Автор', last_name='Автор'
+            )
+            for index in range(2)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {index}', color=f'#00000{index}',
+                               slug=f'tag{index}')
+            for index in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {index}',
+                                      measurement_unit='г')
+            for index in range(3)
+        ]
+        for index in range(RECIPES):
+            recipe = Recipe.objects.create(
+                author=authors[index % 2], name=f'Рецепт {index}',
+                text='Текст', cooking_time=10
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in ingredients
+            ])
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            Cart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.create(subscriber=cls.user,
+                                    subscribed_to=authors[0])
+        cls.recipe = recipe
+
+    def setUp(self):
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_queries(self, client, urls, expected):
+        """
+        Проверяет, что каждый из адресов urls (страницы разного размера)
+        обрабатывается за expected запросов.
+        """
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_list_anonymous(self):
+        # Страница, теги, ингредиенты; для номеров страниц - еще COUNT.
+        self.assert_queries(
+            self.anonymous, ['/api/recipes/', '/api/recipes/?page=2'], 4
+        )
+        self.assert_queries(self.anonymous, [
+            '/api/recipes/?pagination=cursor&limit=2',
+            f'/api/recipes/?pagination=cursor&limit={RECIPES}',
+        ], 3)
+
+    def test_list_authenticated(self):
+        # Дополнительно: избранное, список покупок и подписки пользователя.
+        self.assert_queries(
+            self.client, ['/api/recipes/', '/api/recipes/?page=2'], 7
+        )
+        self.assert_queries(self.client, [
+            '/api/recipes/?pagination=cursor&limit=2',
+            f'/api/recipes/?pagination=cursor&limit={RECIPES}',
+        ], 6)
+
+    def test_list_authenticated_filtered(self):
+        # Фильтр по избранному выполняется в базе, без общего кэша.
+        self.assert_queries(self.client, [
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_favorited=1&page=2',
+        ], 5)
+        self.assert_queries(self.client, [
+            '/api/recipes/?is_favorited=1&pagination=cursor&limit=2',
+            '/api/recipes/?is_favorited=1&pagination=cursor'
+            f'&limit={RECIPES}',
+        ], 4)
+
+    def test_retrieve(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        # Рецепт с автором, теги, ингредиенты.
+        self.assert_queries(self.anonymous, [url], 3)
+        # Дополнительно: подписки пользователя.
+        self.assert_queries(self.client, [url], 4)
@@ -0,0 +1,42 @@
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from recipes.synthetic import SyntheticData
+
+
+class QueryPlansTest(TestCase):
+    """
+    Планы запросов основных страниц API (check_query_plans) на
+    синтетических данных: большие таблицы не читаются последовательно.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        SyntheticData(users=1000, recipes=12000).generate()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def check_query_plans(self):
+        call_command('check_query_plans', stdout=io.StringIO())
+
+    def test_plans(self):
+        self.check_query_plans()
+
+    def test_missing_index(self):
+        # Без индексов по дате публикации лента читает всю таблицу.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE tablename = 'recipes_recipe' "
+                "AND indexdef LIKE '%%(pub_date%%'"
+            )
+            for name, in cursor.fetchall():
+                cursor.execute(f'DROP INDEX {name}')
+        with self.assertRaisesMessage(
+            CommandError, 'feed: последовательное чтение recipes_recipe'
+        ):
+            self.check_query_plans()
@@ -0,0 +1,114 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+URL = '/api/recipes/'
+
+
+class RecipeListCacheTest(TestCase):
+    """
+    Страницы списка рецептов отдаются из общего кэша с подстановкой
+    состояния пользователя и сбрасываются при изменении данных.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = [
+            User.objects.create(username=name, email=f'{name}@example.com',
+                                first_name=name, last_name=name)
+            for name in ('author', 'reader')
+        ]
+        cls.tag = Tag.objects.create(name='Обед', color='#000000',
+                                     slug='lunch')
+        cls.recipe = Recipe.objects.create(author=cls.author, name='Суп',
+                                           text='Текст', cooking_time=30)
+        cls.recipe.tags.set([cls.tag])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, **headers):
+        response = self.client.get(URL, **headers)
+        self.assertIn(response.status_code, (200, 304))
+        return response
+
+    def assert_no_recipe_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get()
+        self.assertEqual(
+            [query['sql'] for query in queries
+             if '"recipes_' in query['sql'] or '"users_' in query['sql']],
+            []
+        )
+        return response
+
+    def first_result(self, response):
+        return response.json()['results'][0]
+
+    def test_anonymous_hit(self):
+        first = self.get()
+        second = self.assert_no_recipe_queries()
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_authenticated_hit(self):
+        self.client.force_authenticate(self.reader)
+        first = self.get()
+        second = self.assert_no_recipe_queries()
+        self.assertEqual(second.json(), first.json())
+
+    def test_user_state_overlay(self):
+        self.client.force_authenticate(self.reader)
+        first = self.get()
+        self.assertFalse(self.first_result(first)['is_favorited'])
+        favorite = f'/api/recipes/{self.recipe.pk}/favorite/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(favorite).status_code, 201)
+        second = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(self.first_result(second)['is_favorited'])
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(
+            self.get(HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304
+        )
+
+        # Состояние пользователя не попадает в общую страницу.
+        anonymous = APIClient().get(URL)
+        self.assertFalse(self.first_result(anonymous)['is_favorited'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(favorite).status_code, 204)
+        third = self.get()
+        self.assertFalse(self.first_result(third)['is_favorited'])
+        self.assertEqual(third['ETag'], first['ETag'])
+
+    def test_tag_change(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Ужин'
+            self.tag.save()
+        self.assertEqual(
+            self.first_result(self.get())['tags'][0]['name'], 'Ужин'
+        )
+
+    def test_recipe_change(self):
+        self.get()
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/recipes/{self.recipe.pk}/',
+                                         {'name': 'Борщ'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.first_result(self.get())['name'], 'Борщ')
+
+    def test_author_change(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Автор'
+            self.author.save()
+        self.assertEqual(
+            self.first_result(self.get())['author']['first_name'], 'Автор'
+        )
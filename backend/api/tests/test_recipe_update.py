@@ -0,0 +1,34 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+
+class RecipePartialUpdateTest(TestCase):
+    """Частичное обновление рецепта без тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Автор'
+        )
+        cls.tag = Tag.objects.create(name='Обед', color='#000000',
+                                     slug='lunch')
+        cls.recipe = Recipe.objects.create(author=cls.author, name='Суп',
+                                           text='Текст', cooking_time=30)
+        cls.recipe.tags.set([cls.tag])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_patch_without_tags(self):
+        response = self.client.patch(f'/api/recipes/{self.recipe.pk}/', {
+            'name': 'Борщ'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Борщ')
+        self.assertEqual(list(self.recipe.tags.all()), [self.tag])
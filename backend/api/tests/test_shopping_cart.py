@@ -0,0 +1,61 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.renderers import ShoppingCartRenderer
+from recipes.models import Cart, Ingredient, Recipe, RecipeIngredient
+from users.models import User
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingCartDownloadTest(TestCase):
+    """Скачивание списка покупок в разных форматах."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='cook', email='cook@example.com',
+            first_name='Повар', last_name='Повар'
+        )
+        recipe = Recipe.objects.create(author=cls.user, name='Борщ',
+                                       text='Текст', cooking_time=60)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe, amount=index + 1,
+                ingredient=Ingredient.objects.create(
+                    name=f'Свекла сорт {index}', measurement_unit='г'
+                )
+            )
+            for index in range(60)
+        ])
+        Cart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_text(self):
+        response = self.client.get(URL)
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('* Свекла сорт 0 (г) — 1\n', content)
+
+    def test_pdf(self):
+        response = self.client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="shopping_cart.pdf"')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn(b'DejaVuSans', content)
+        # 60 строк не помещаются на одну страницу A4.
+        self.assertIn(b'/Count 2', content)
+
+    def test_renderer_requires_stream(self):
+        class Incomplete(ShoppingCartRenderer):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
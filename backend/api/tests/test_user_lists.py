@@ -0,0 +1,145 @@
+from django.conf import settings
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (Cart, CartIngredient, Favorite, Ingredient,
+                            Recipe, RecipeIngredient)
+from users.models import User
+
+
+class UserListToggleTest(TestCase):
+    """Избранное и список покупок: по одному рецепту и списком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.user = [
+            User.objects.create(username=name, email=f'{name}@example.com',
+                                first_name=name, last_name=name)
+            for name in ('author', 'user')
+        ]
+        cls.salt, cls.beet = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'свекла')
+        ]
+        cls.soup, cls.salad = [
+            Recipe.objects.create(author=cls.author, name=name,
+                                  text='Текст', cooking_time=30)
+            for name in ('Борщ', 'Салат')
+        ]
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=cls.soup, ingredient=cls.salt, amount=5),
+            RecipeIngredient(recipe=cls.soup, ingredient=cls.beet,
+                             amount=300),
+            RecipeIngredient(recipe=cls.salad, ingredient=cls.salt,
+                             amount=2),
+        ])
+        cls.missing = Recipe.objects.order_by('-pk').first().pk + 100
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def favorites_count(self, recipe):
+        recipe.refresh_from_db()
+        return recipe.favorites_count
+
+    def cart_totals(self):
+        return dict(CartIngredient.objects.filter(
+            user=self.user
+        ).values_list('ingredient__name', 'amount'))
+
+    def test_favorite(self):
+        url = f'/api/recipes/{self.soup.pk}/favorite/'
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['id'], self.soup.pk)
+        self.assertEqual(self.favorites_count(self.soup), 1)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.favorites_count(self.soup), 1)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.favorites_count(self.soup), 0)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.favorites_count(self.soup), 0)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_unknown_recipe(self):
+        for pk in (self.missing, 'abc'):
+            for action in ('favorite', 'shopping_cart'):
+                url = f'/api/recipes/{pk}/{action}/'
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.post(url).status_code, 404)
+                    self.assertEqual(self.client.delete(url).status_code,
+                                     404)
+
+    def test_anonymous(self):
+        client = APIClient()
+        self.assertEqual(
+            client.post(f'/api/recipes/{self.soup.pk}/favorite/').status_code,
+            401
+        )
+        self.assertEqual(client.post('/api/recipes/favorite/', {
+            'recipes': [self.soup.pk]
+        }, format='json').status_code, 401)
+
+    def test_shopping_cart(self):
+        url = f'/api/recipes/{self.soup.pk}/shopping_cart/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.cart_totals(), {'соль': 5, 'свекла': 300})
+        self.soup.refresh_from_db()
+        self.assertEqual(self.soup.cart_count, 1)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.cart_totals(), {})
+        self.soup.refresh_from_db()
+        self.assertEqual(self.soup.cart_count, 0)
+
+    def test_bulk_favorite(self):
+        url = '/api/recipes/favorite/'
+        ids = [self.soup.pk, self.salad.pk, self.soup.pk, self.missing]
+        response = self.client.post(url, {'recipes': ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(),
+                         {'added': sorted([self.soup.pk, self.salad.pk])})
+        self.assertEqual(self.favorites_count(self.soup), 1)
+        self.assertEqual(self.favorites_count(self.salad), 1)
+
+        response = self.client.post(url, {'recipes': ids}, format='json')
+        self.assertEqual(response.json(), {'added': []})
+        self.assertEqual(self.favorites_count(self.soup), 1)
+
+        response = self.client.delete(url, {
+            'recipes': [self.soup.pk, self.missing]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'removed': [self.soup.pk]})
+        self.assertEqual(self.favorites_count(self.soup), 0)
+        self.assertEqual(self.favorites_count(self.salad), 1)
+
+    def test_bulk_shopping_cart(self):
+        url = '/api/recipes/shopping_cart/'
+        response = self.client.post(url, {
+            'recipes': [self.soup.pk, self.salad.pk, self.salad.pk]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.cart_totals(), {'соль': 7, 'свекла': 300})
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 2)
+
+        response = self.client.delete(url, {
+            'recipes': [self.soup.pk]
+        }, format='json')
+        self.assertEqual(response.json(), {'removed': [self.soup.pk]})
+        self.assertEqual(self.cart_totals(), {'соль': 2})
+
+    def test_bulk_validation(self):
+        for data in ({'recipes': []}, {'recipes': ['abc']}, {},
+                     {'recipes': list(range(
+                         1, settings.RECIPE_BULK_LIMIT + 2
+                     ))}):
+            with self.subTest(data=data):
+                response = self.client.post('/api/recipes/favorite/', data,
+                                            format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Favorite.objects.exists())
@@ -1,6 +1,10 @@
+import djoser.urls
+import djoser.urls.authtoken
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
+from .async_views import async_urlpatterns
 from .views import (SubscriptionsListViewSet, SubscribeViewSet, TagViewSet,
                     IngredientViewSet, RecipesViewSet)
 
@@ -15,8 +19,16 @@ router_v1.register('tags', TagViewSet, basename='tags')
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register('recipes', RecipesViewSet, basename='recipes')
 
+api_urls = router_v1.urls
+user_urls = djoser.urls.urlpatterns
+token_urls = djoser.urls.authtoken.urlpatterns
+if settings.ASYNC_VIEWS:
+    api_urls = async_urlpatterns(api_urls)
+    user_urls = async_urlpatterns(user_urls)
+    token_urls = async_urlpatterns(token_urls)
+
 urlpatterns = [
-    path('', include(router_v1.urls)),
-    path('', include('djoser.urls')),
-    path('auth/', include('djoser.urls.authtoken')),
+    path('', include(api_urls)),
+    path('', include(user_urls)),
+    path('auth/', include(token_urls)),
 ]
@@ -1,5 +1,7 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import urlencode
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
@@ -8,24 +10,61 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
 
-from recipes.models import Tag, Ingredient, Recipe, Favorite, Cart
+from recipes.cache import ingredients_cache, recipes_cache, tags_cache
+from recipes.cart import shopping_list
+from recipes.models import Tag, Ingredient, Recipe
+from recipes.user_lists import (carts, favorites, subscriptions,
+                                user_list_ids)
 from .filters import TagFilter, IngredientSearchFilter
+from .mixins import (ConditionalResponseMixin, KeysetPaginationMixin,
+                     ReferenceCacheMixin)
+from .pagination import (FeedKeysetPagination, RecipeKeysetPagination,
+                         SubscriptionKeysetPagination)
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
-from .serializers import (SubscriptionSerializer, TagSerializer,
+from .renderers import (ShoppingCartTextRenderer, ShoppingCartCSVRenderer,
+                        ShoppingCartJSONRenderer, ShoppingCartPDFRenderer)
+from .serializers import (AuthorIdsSerializer, TagSerializer,
                           IngredientSerializer, RecipeCreateUpdateSerializer,
-                          RecipeListSerializer, UserSubscribeSerializer,
-                          UserRecipeSerializer)
-from users.models import User, Subscription
+                          RecipeIdsSerializer, RecipeListSerializer,
+                          UserSubscribeSerializer, UserRecipeSerializer,
+                          get_subscribed_ids)
+from users.models import User
 
 
-class SubscriptionsListViewSet(viewsets.GenericViewSet):
+def get_recipes_limit(request):
+    """Возвращает значение параметра recipes_limit или None."""
+    try:
+        limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+    return limit if limit >= 0 else None
+
+
+def prefetch_author_recipes(request, authors):
+    """
+    Загружает рецепты авторов одним запросом с учетом recipes_limit для
+    UserSubscribeSerializer.
+    """
+    recipes = Recipe.objects.filter(author__in=authors)
+    limit = get_recipes_limit(request)
+    if limit is not None:
+        recipes = recipes.limit_per_author(limit)
+    prefetch_related_objects(authors, Prefetch('recipes', queryset=recipes))
+    return authors
+
+
+class SubscriptionsListViewSet(KeysetPaginationMixin,
+                               viewsets.GenericViewSet):
     """Вьюсет для списка подписок пользователя."""
     permission_classes = (IsAuthenticated,)
+    keyset_pagination_class = SubscriptionKeysetPagination
 
     def list(self, request):
         """Получает список подписок пользователя."""
         queryset = User.objects.filter(subscribed_to__subscriber=request.user)
-        pages = self.paginate_queryset(queryset)
+        pages = prefetch_author_recipes(
+            request, self.paginate_queryset(queryset)
+        )
         serializer = UserSubscribeSerializer(
             pages,
             many=True,
@@ -33,63 +72,105 @@ class SubscriptionsListViewSet(viewsets.GenericViewSet):
         )
         return self.get_paginated_response(serializer.data)
 
+    @action(methods=['post', 'delete'], detail=False)
+    def batch(self, request):
+        """
+        Подписывает (POST) или отписывает (DELETE) пользователя от
+        авторов из списка id одним запросом к таблице подписок. Возвращает
+        id авторов, подписка на которых действительно изменилась.
+        """
+        serializer = AuthorIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        author_ids = serializer.validated_data['authors']
+        if request.method == 'DELETE':
+            return Response(
+                {'removed': subscriptions.remove(request.user.pk, author_ids)}
+            )
+        if request.user.pk in author_ids:
+            return Response(
+                {'errors': 'Нельзя подписаться на самого себя'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'added': subscriptions.add(request.user.pk, author_ids)},
+            status=status.HTTP_201_CREATED
+        )
+
 
 class SubscribeViewSet(viewsets.GenericViewSet):
-    """Вьюсет для управления подписками."""
+    """
+    Вьюсет для управления подписками. Подписка и отписка выполняются
+    одним запросом к таблице подписок; существование автора проверяется
+    отдельно, только если строка не изменилась.
+    """
     permission_classes = (IsAuthenticated,)
 
     def create(self, request, user_id=None):
         """Создает подписку на автора."""
-        subscriber = request.user
-        subscribed_to = get_object_or_404(User, pk=user_id)
-        if subscriber == subscribed_to:
+        user_id = int(user_id)
+        if user_id == request.user.pk:
             return Response(
                 {'errors': 'Нельзя подписаться на самого себя'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        queryset = Subscription.objects.create(
-            subscribed_to=subscribed_to,
-            subscriber=subscriber
+        if not subscriptions.add(request.user.pk, [user_id]):
+            get_object_or_404(User, pk=user_id)
+            return Response(
+                {'errors': 'Вы уже подписаны на этого автора'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        author = prefetch_author_recipes(
+            request, list(User.objects.filter(pk=user_id))
         )
-        serializer = SubscriptionSerializer(
-            queryset,
+        serializer = UserSubscribeSerializer(
+            author[0],
             context={'request': request}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, user_id=None):
         """Удаляет подписку на автора."""
-        subscribed_to = get_object_or_404(User, pk=user_id)
-        get_object_or_404(Subscription, subscriber=request.user,
-                          subscribed_to=subscribed_to).delete()
+        user_id = int(user_id)
+        if not subscriptions.remove(request.user.pk, [user_id]):
+            get_object_or_404(User, pk=user_id)
+            return Response(
+                {'errors': 'Вы не подписаны на этого автора'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ReferenceCacheMixin, ReadOnlyModelViewSet):
     """Вьюсет для тегов рецептов."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+    reference_cache = tags_cache
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, ReadOnlyModelViewSet):
     """Вьюсет для ингредиентов."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
+    reference_cache = ingredients_cache
     pagination_class = None
     filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
 
 
-class RecipesViewSet(ModelViewSet):
-    """Вьюсет для рецептов."""
+class RecipesViewSet(ConditionalResponseMixin, KeysetPaginationMixin,
+                     ModelViewSet):
+    """
+    Вьюсет для рецептов. Списки, лента и рецепт поддерживают условные
+    запросы по ETag.
+    """
     queryset = Recipe.objects.all()
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = (IsOwnerOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filter_class = TagFilter
+    keyset_pagination_class = RecipeKeysetPagination
 
     def perform_create(self, serializer):
         """Метод для создания рецепта."""
@@ -101,102 +182,245 @@ class RecipesViewSet(ModelViewSet):
             return RecipeCreateUpdateSerializer
         return RecipeListSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов из общего кэша recipes_cache. Страница кэшируется
+        без данных пользователя, а is_favorited, is_in_shopping_cart и
+        is_subscribed подставляются при ответе из кэшированных множеств id
+        пользователя, которые читаются одним обращением к кэшу. Фильтры по
+        избранному и списку покупок зависят от пользователя и выполняются
+        запросом к базе.
+        """
+        params = request.query_params
+        if (self.paginator is None or 'is_favorited' in params
+                or 'is_in_shopping_cart' in params):
+            return super().list(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            state = user_list_ids(request.user.pk,
+                                  (favorites, carts, subscriptions))
+            request.subscribed_ids = state[2]
+        else:
+            state = (frozenset(), frozenset(), frozenset())
+        version = recipes_cache.version()
+        key = self.get_list_cache_key(request)
+        data = recipes_cache.get(key, version)
+        if data is None:
+            page = self.paginate_queryset(
+                self.filter_queryset(self.get_queryset())
+            )
+            results = self.overlay_user_state(
+                self.get_serializer(page, many=True).data,
+                frozenset(), frozenset(), frozenset()
+            )
+            data = dict(self.get_paginated_response(results).data)
+            recipes_cache.set(key, data, version)
+
+        results = self.overlay_user_state(data['results'], *state)
+        etag = self.get_list_etag(version, key, results)
+        return self.conditional_response(
+            request, etag, lambda: Response({**data, 'results': results})
+        )
+
+    @staticmethod
+    def get_list_cache_key(request):
+        params = urlencode(sorted(request.GET.lists()), doseq=True)
+        return f'{request.get_host()}{request.path}?{params}'
+
+    @classmethod
+    def get_list_etag(cls, version, key, results):
+        return cls.make_etag([version, key, [
+            (recipe['id'], recipe['is_favorited'],
+             recipe['is_in_shopping_cart'], recipe['author']['is_subscribed'])
+            for recipe in results
+        ]])
+
+    @staticmethod
+    def overlay_user_state(results, favorited, in_cart, subscribed):
+        """Подставляет в рецепты состояние избранного, покупок и подписки."""
+        return [
+            {**recipe,
+             'is_favorited': recipe['id'] in favorited,
+             'is_in_shopping_cart': recipe['id'] in in_cart,
+             'author': {**recipe['author'],
+                        'is_subscribed': recipe['author']['id'] in subscribed}}
+            for recipe in results
+        ]
+
+    def get_etag_values(self, recipe):
+        """
+        Версия рецепта, состояние избранного, списка покупок и подписки
+        пользователя, а также отображаемые поля автора.
+        """
+        author = recipe.author
+        return (*super().get_etag_values(recipe), recipe.is_favorited,
+                recipe.is_in_shopping_cart,
+                author.pk in get_subscribed_ids(self.request),
+                author.email, author.username, author.first_name,
+                author.last_name)
+
     def get_queryset(self):
         """Метод для получения списка рецептов."""
-        qs = Recipe.objects.add_user_annotations(self.request.user.pk)
+        qs = Recipe.objects.add_user_annotations(
+            self.request.user.pk
+        ).with_related()
         is_favorited = self.request.query_params.get('is_favorited')
         is_in_shopping_cart = self.request.query_params.get(
             'is_in_shopping_cart'
         )
         author = self.request.query_params.get('author', None)
         if is_favorited:
-            qs = qs.filter(favorites__user=self.request.user)
+            qs = qs.filter(is_favorited=True)
         if is_in_shopping_cart:
-            qs = qs.filter(cart__user=self.request.user)
+            qs = qs.filter(is_in_shopping_cart=True)
         if author:
             qs = qs.filter(author=author)
         return qs
 
+    def toggle_recipe(self, request, pk, user_list, messages):
+        """
+        Добавляет рецепт в список пользователя (POST) или удаляет из него
+        (DELETE) одним запросом к таблице списка. Если строка не
+        изменилась, отвечает 404 для несуществующего рецепта и 400, если
+        рецепт уже есть в списке или его там нет.
+        """
+        try:
+            recipe_id = Recipe._meta.pk.to_python(pk)
+        except ValidationError:
+            raise Http404
+        if request.method == 'POST':
+            if user_list.add(request.user.pk, [recipe_id]):
+                serializer = UserRecipeSerializer(
+                    Recipe.objects.get(pk=recipe_id),
+                    context={'request': request}
+                )
+                return Response(serializer.data,
+                                status=status.HTTP_201_CREATED)
+            error = messages['exists']
+        else:
+            if user_list.remove(request.user.pk, [recipe_id]):
+                return Response({'detail': messages['removed']},
+                                status=status.HTTP_204_NO_CONTENT)
+            error = messages['missing']
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            raise Http404
+        return Response({'errors': error},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    def toggle_recipes(self, request, user_list):
+        """
+        Добавляет (POST) или удаляет (DELETE) рецепты из списка id в теле
+        запроса одним запросом к таблице списка. Возвращает id рецептов,
+        которые действительно были добавлены или удалены.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            return Response(
+                {'added': user_list.add(request.user.pk, recipe_ids)},
+                status=status.HTTP_201_CREATED
+            )
+        return Response(
+            {'removed': user_list.remove(request.user.pk, recipe_ids)}
+        )
+
     @action(
         methods=['post', 'delete'],
         detail=True,
         permission_classes=(IsAuthenticated,)
     )
-    def favorite(self, request, **kwargs):
+    def favorite(self, request, pk=None):
         """
         Метод для добавления или удаления рецепта из избранного
         пользователя.
         """
-        recipe = get_object_or_404(Recipe, id=kwargs['pk'])
-
-        if request.method == 'POST':
-            serializer = UserRecipeSerializer(recipe, data=request.data,
-                                              context={"request": request})
-            serializer.is_valid(raise_exception=True)
-            if not Favorite.objects.filter(user=request.user,
-                                           recipe=recipe).exists():
-                Favorite.objects.create(user=request.user, recipe=recipe)
-                return Response(serializer.data,
-                                status=status.HTTP_201_CREATED)
+        return self.toggle_recipe(request, pk, favorites, {
+            'exists': 'Рецепт уже в избранном.',
+            'missing': 'Рецепта нет в избранном.',
+            'removed': 'Рецепт удален из избранного.',
+        })
 
-        if request.method == 'DELETE':
-            get_object_or_404(Favorite, user=request.user,
-                              recipe=recipe).delete()
-            return Response({'detail': 'Рецепт удален из избранного.'},
-                            status=status.HTTP_204_NO_CONTENT)
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite',
+        url_name='favorite-bulk'
+    )
+    def favorite_bulk(self, request):
+        """Добавление или удаление нескольких рецептов в избранном."""
+        return self.toggle_recipes(request, favorites)
 
     @action(
         methods=['post', 'delete'],
         detail=True,
         permission_classes=(IsAuthenticated,)
     )
-    def shopping_cart(self, request, **kwargs):
+    def shopping_cart(self, request, pk=None):
         """
         Метод для добавления или удаления рецепта из списка покупок
         пользователя.
         """
-        recipe = get_object_or_404(Recipe, id=kwargs['pk'])
+        return self.toggle_recipe(request, pk, carts, {
+            'exists': 'Рецепт уже в списке покупок.',
+            'missing': 'Рецепта нет в списке покупок.',
+            'removed': 'Рецепт удален из списка покупок.',
+        })
 
-        if request.method == 'POST':
-            serializer = UserRecipeSerializer(recipe, data=request.data,
-                                              context={"request": request})
-            serializer.is_valid(raise_exception=True)
-            if not Cart.objects.filter(user=request.user,
-                                       recipe=recipe).exists():
-                Cart.objects.create(user=request.user, recipe=recipe)
-                return Response(serializer.data,
-                                status=status.HTTP_201_CREATED)
-
-        if request.method == 'DELETE':
-            get_object_or_404(Cart, user=request.user,
-                              recipe=recipe).delete()
-            return Response(
-                {'detail': 'Рецепт удален из списка покупок.'},
-                status=status.HTTP_204_NO_CONTENT)
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk'
+    )
+    def shopping_cart_bulk(self, request):
+        """
+        Добавление или удаление нескольких рецептов в списке покупок,
+        например всего плана питания.
+        """
+        return self.toggle_recipes(request, carts)
 
     @action(
         methods=['get'],
         detail=False,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedKeysetPagination
     )
-    def download_shopping_cart(self, request):
+    def feed(self, request):
         """
-        Метод для скачивания списка покупок пользователя в виде текстового
-        файла.
+        Лента рецептов авторов, на которых подписан пользователь, от новых
+        к старым. Страницы выдаются по ключу (параметры cursor и limit).
         """
-        ingredients = Cart.objects.filter(
-            user=request.user.id).values_list(
-            'recipe__ingredients__name',
-            'recipe__ingredients__measurement_unit'
-        ).annotate(ingredient_amount=Sum('recipe__recipeingredient__amount'))
-
-        response = HttpResponse(content_type='text/plain')
-        response[
-            'Content-Disposition'] = 'attachment; filename="shopping_cart.txt"'
+        queryset = Recipe.objects.add_user_annotations(
+            request.user.pk
+        ).with_related().for_subscriber(request.user.pk)
+        return self.conditional_list(request, queryset)
 
-        for item in ingredients:
-            response.write(
-                f"* {item[0]} ({item[1]}) — {item[2]}\n"
-            )
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(ShoppingCartTextRenderer, ShoppingCartCSVRenderer,
+                          ShoppingCartJSONRenderer, ShoppingCartPDFRenderer)
+    )
+    def download_shopping_cart(self, request):
+        """
+        Метод для скачивания списка покупок пользователя.
 
+        Формат выбирается по заголовку Accept или параметру format
+        (txt, csv, json, pdf), по умолчанию - текстовый файл.
+        """
+        ingredients = shopping_list(request.user)
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"'
+        )
         return response
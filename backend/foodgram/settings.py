@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,10 +81,36 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
     }
 }
 
+# Кэш должен быть общим для всех процессов: в нем хранятся версии
+# справочников и списков рецептов, списки пользователей и ленты. По
+# умолчанию используется memcached, в docker-compose - сервис memcached.
+# Запасной вариант - DatabaseCache (CACHE_BACKEND=
+# django.core.cache.backends.db.DatabaseCache, таблица django_cache
+# создается миграцией), но тогда каждое обращение к кэшу - SQL-запрос.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND',
+    default='django.core.cache.backends.memcached.PyMemcacheCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=('127.0.0.1:11211' if 'memcached' in CACHE_BACKEND
+                     else 'django_cache')
+        ),
+    }
+}
+if 'memcached' not in CACHE_BACKEND:
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=100000)),
+    }
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -148,7 +175,10 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.getenv('MEDIA_ROOT',
+                       default=os.path.join(BASE_DIR, 'media'))
+
+TEST_RUNNER = 'foodgram.test_runner.FoodgramTestRunner'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -166,3 +196,40 @@ RECIPE_LENGTH = 200
 HEX_LENGTH = 7
 MEASUREMENT_LENGTH = 24
 COOKING_TIME = 0
+REFERENCE_CACHE_SIZE = 1024
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько секунд процесс использует прочитанную из общего кэша версию
+# справочника, не обращаясь к кэшу.
+REFERENCE_CACHE_VERSION_TTL = float(
+    os.getenv('REFERENCE_CACHE_VERSION_TTL', default=1)
+)
+INGREDIENT_SEARCH_IN_MEMORY = True
+INGREDIENT_SEARCH_LIMIT = 100
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+RECIPE_IMAGE_MAX_SIDE = 1920
+RECIPE_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+RECIPE_IMAGE_VARIANTS = {
+    'image_small': 320,
+    'image_medium': 640,
+}
+IMAGE_PROCESSING_ASYNC = True
+IMAGE_PROCESSING_WORKERS = 2
+# Шрифт с кириллицей из пакета fonts-dejavu-core.
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+RECIPE_SEARCH_CONFIGS = ('russian', 'english')
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', default=20))
+REQUEST_TIME_BUDGET = float(os.getenv('REQUEST_TIME_BUDGET', default=0.5))
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+FEED_CACHE_SIZE = 200
+FEED_CACHE_TIMEOUT = 60 * 10
+RECIPE_BULK_LIMIT = 100
+SUBSCRIBE_BULK_LIMIT = 100
+USER_LIST_CACHE_TIMEOUT = 60 * 60
+RECIPE_LIST_CACHE_SIZE = 256
+RECIPE_LIST_CACHE_TIMEOUT = 60 * 10
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', default=10))
@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Данные DatabaseCache откатываются вместе с транзакцией теста, поэтому
+# тесты не видят кэш друг друга.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
+
+class FoodgramTestRunner(DiscoverRunner):
+    """
+    Запускает тесты с временным MEDIA_ROOT, чтобы обработанные
+    изображения не попадали в каталог media проекта, и с кэшем в базе.
+
+    Версии справочников при этом читаются из кэша при каждом обращении
+    (REFERENCE_CACHE_VERSION_TTL = 0): запомненная в процессе версия не
+    откатывается вместе с транзакцией теста.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix='foodgram-media-')
+        self.test_settings = override_settings(
+            MEDIA_ROOT=self.media_root, CACHES=TEST_CACHES,
+            REFERENCE_CACHE_VERSION_TTL=0
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,5 +1,10 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.core.files.uploadedfile import UploadedFile
 
+from . import cart
+from .images import PendingImage, schedule_recipe_image
 from .models import (Tag, Ingredient, Recipe, RecipeIngredient,
                      Favorite, Cart)
 
@@ -13,6 +18,27 @@ class IngredientTabular(admin.TabularInline):
     model = RecipeIngredient
 
 
+class RecipeAdminForm(forms.ModelForm):
+    """
+    Форма рецепта в административной панели. Загруженное изображение
+    проверяется так же, как при загрузке через API.
+    """
+
+    class Meta:
+        model = Recipe
+        fields = '__all__'
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            width, height = image.image.size
+            if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    'Слишком большое разрешение изображения.'
+                )
+        return image
+
+
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     """
@@ -24,7 +50,11 @@ class RecipeAdmin(admin.ModelAdmin):
     - 'name': Название рецепта.
     - 'pub_date': Дата публикации рецепта.
     - 'count_favorites': Количество избранных рецептов.
+
+    Загруженное изображение не сохраняется как есть, а обрабатывается в
+    очереди изображений после сохранения рецепта.
     """
+    form = RecipeAdminForm
     list_display = (
         'pk',
         'author',
@@ -37,8 +67,31 @@ class RecipeAdmin(admin.ModelAdmin):
         IngredientTabular,
     ]
 
+    def save_model(self, request, obj, form, change):
+        """
+        Сохраняет рецепт с прежним изображением и ставит загруженное в
+        очередь обработки (PendingImage).
+        """
+        upload = form.cleaned_data.get('image')
+        if not isinstance(upload, UploadedFile):
+            super().save_model(request, obj, form, change)
+            return
+        pending = PendingImage.from_file(upload)
+        obj.image = Recipe.objects.filter(pk=obj.pk).values_list(
+            'image', flat=True
+        ).first() if change else None
+        super().save_model(request, obj, form, change)
+        schedule_recipe_image(obj, pending)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(pk=form.instance.pk).update_search_vector()
+        cart.rebuild(Cart.objects.filter(
+            recipe=form.instance
+        ).values_list('user', flat=True))
+
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     count_favorites.short_description = 'в избранном (кол-во)'
 
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tag
+
+
+class ReferenceCache:
+    """
+    Двухуровневый кэш справочных данных.
+
+    Первый уровень - LRU в памяти процесса, второй - общий бэкенд Django
+    cache. Ключи обоих уровней содержат версию справочника (время его
+    последнего изменения), поэтому инвалидация сводится к смене версии.
+
+    Версия хранится во втором уровне, поэтому бэкенд должен быть общим для
+    всех процессов (см. recipes.checks). Прочитанная версия запоминается в
+    процессе на REFERENCE_CACHE_VERSION_TTL секунд, так что попадание в
+    первый уровень не требует обращений к общему кэшу, а изменения из
+    других процессов становятся видны не позже чем через этот интервал.
+    Если бэкенд вытеснит ключ версии, назначается новая версия: это
+    приводит к промаху, а не к устаревшим данным.
+    """
+
+    def __init__(self, name, maxsize=None, timeout=None):
+        self.name = name
+        self.maxsize = maxsize or settings.REFERENCE_CACHE_SIZE
+        self.timeout = timeout or settings.REFERENCE_CACHE_TIMEOUT
+        self._local = OrderedDict()
+        self._version = None
+        self._version_expires = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version_key(self):
+        return f'reference:{self.name}:version'
+
+    def version(self):
+        """Возвращает текущую версию справочника."""
+        with self._lock:
+            if time.monotonic() < self._version_expires:
+                return self._version
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time(), None)
+            version = cache.get(self.version_key)
+        self._remember_version(version)
+        return version
+
+    def invalidate(self):
+        """Сбрасывает кэш, назначая справочнику новую версию."""
+        version = time.time()
+        cache.set(self.version_key, version, None)
+        with self._lock:
+            self._local.clear()
+        self._remember_version(version)
+
+    def _remember_version(self, version):
+        with self._lock:
+            self._version = version
+            self._version_expires = (
+                time.monotonic() + settings.REFERENCE_CACHE_VERSION_TTL
+            )
+
+    def shared_key(self, key, version):
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return f'reference:{self.name}:{version}:{digest}'
+
+    def get(self, key, version):
+        """Возвращает значение для версии version или None."""
+        with self._lock:
+            if (version, key) in self._local:
+                self._local.move_to_end((version, key))
+                return self._local[(version, key)]
+        value = cache.get(self.shared_key(key, version))
+        if value is not None:
+            self._remember(key, version, value)
+        return value
+
+    def set(self, key, value, version):
+        cache.set(self.shared_key(key, version), value, self.timeout)
+        self._remember(key, version, value)
+
+    def _remember(self, key, version, value):
+        with self._lock:
+            self._local[(version, key)] = value
+            self._local.move_to_end((version, key))
+            if len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+
+tags_cache = ReferenceCache('tags')
+ingredients_cache = ReferenceCache('ingredients')
+# Общие для всех пользователей страницы списка рецептов. Версия меняется
+# при любом изменении рецептов, их тегов, ингредиентов и авторов.
+recipes_cache = ReferenceCache('recipes',
+                               maxsize=settings.RECIPE_LIST_CACHE_SIZE,
+                               timeout=settings.RECIPE_LIST_CACHE_TIMEOUT)
+
+
+def tag_ids_by_slug():
+    """Возвращает соответствие slug -> id тегов из кэша тегов."""
+    version = tags_cache.version()
+    mapping = tags_cache.get('slug_ids', version)
+    if mapping is None:
+        mapping = dict(Tag.objects.values_list('slug', 'id'))
+        tags_cache.set('slug_ids', mapping, version)
+    return mapping
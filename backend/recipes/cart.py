@@ -0,0 +1,109 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from recipes.models import Cart, CartIngredient, RecipeIngredient
+
+BATCH_SIZE = 1000
+
+
+def shopping_list(user):
+    """Список покупок пользователя: название, единица и количество."""
+    return CartIngredient.objects.filter(user=user).values(
+        'amount',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit')
+    ).order_by('name')
+
+
+def recipe_amounts(recipe_ids):
+    """Возвращает {id ингредиента: количество} суммарно по рецептам."""
+    return dict(RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient').annotate(total=Sum('amount')).order_by())
+
+
+@transaction.atomic
+def apply_deltas(user_ids, deltas):
+    """
+    Прибавляет deltas ({id ингредиента: изменение}) к спискам покупок
+    пользователей user_ids. Строки, количество в которых стало нулевым,
+    удаляются.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    CartIngredient.objects.bulk_create([
+        CartIngredient(user_id=user_id, ingredient_id=ingredient_id)
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items() if delta > 0
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    queryset = CartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    queryset.update(amount=Greatest(F('amount') + Case(
+        *(When(ingredient_id=pk, then=Value(delta))
+          for pk, delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField()
+    ), Value(0)))
+    queryset.filter(amount=0).delete()
+
+
+def add_recipes(user_id, recipe_ids):
+    """Учитывает рецепты, добавленные в список покупок пользователя."""
+    apply_deltas([user_id], recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    """Учитывает рецепты, удаленные из списка покупок пользователя."""
+    apply_deltas([user_id], {
+        pk: -amount for pk, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def change_recipe(recipe_id, deltas):
+    """Учитывает изменение ингредиентов рецепта во всех списках покупок."""
+    if any(deltas.values()):
+        apply_deltas(Cart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True), deltas)
+
+
+def actual_totals(user_ids):
+    """Считает списки покупок пользователей заново по их рецептам."""
+    totals = defaultdict(dict)
+    rows = RecipeIngredient.objects.filter(
+        recipe__cart__user__in=user_ids
+    ).values_list('recipe__cart__user', 'ingredient').annotate(
+        total=Sum('amount')
+    ).order_by()
+    for user_id, ingredient_id, total in rows:
+        totals[user_id][ingredient_id] = total
+    return totals
+
+
+def stored_totals(user_ids):
+    """Возвращает сохраненные списки покупок пользователей."""
+    totals = defaultdict(dict)
+    rows = CartIngredient.objects.filter(
+        user__in=user_ids
+    ).values_list('user', 'ingredient', 'amount')
+    for user_id, ingredient_id, amount in rows:
+        totals[user_id][ingredient_id] = amount
+    return totals
+
+
+@transaction.atomic
+def rebuild(user_ids):
+    """Пересоздает сохраненные списки покупок пользователей user_ids."""
+    user_ids = list(user_ids)
+    CartIngredient.objects.filter(user__in=user_ids).delete()
+    CartIngredient.objects.bulk_create([
+        CartIngredient(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=amount)
+        for user_id, totals in actual_totals(user_ids).items()
+        for ingredient_id, amount in totals.items()
+    ], batch_size=BATCH_SIZE)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды, данные которых видны только текущему процессу.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Предупреждает, если кэш по умолчанию локален для процесса: сброс
+    версий справочников, списков рецептов, списков пользователей и лент
+    тогда не доходит до других воркеров и команд manage.py, и они отдают
+    устаревшие данные до истечения таймаута.
+    """
+    if settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        'Кэш по умолчанию локален для процесса, изменения не будут видны '
+        'другим процессам.',
+        hint='Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION '
+             '(memcached или, как запасной вариант, DatabaseCache).',
+        id='recipes.W001',
+    )]
@@ -0,0 +1,37 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Cart, Favorite, Recipe
+from users.models import Subscription, User
+
+# Денормализованные счетчики: (модель, поле счетчика, модель со строками,
+# внешний ключ из нее на модель со счетчиком).
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'cart_count', Cart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'subscribed_to'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счетчик field у объекта model на delta."""
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """Атомарно изменяет счетчик field у объектов model с ключами pks."""
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(related_model, fk_name):
+    """Подзапрос с количеством строк related_model для OuterRef('pk')."""
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{fk_name: OuterRef('pk')}
+        ).order_by().values(fk_name).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
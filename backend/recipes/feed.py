@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from users.models import Subscription
+
+from .models import Recipe
+
+BATCH_SIZE = 1000
+
+
+def feed_key(user_id):
+    return f'feed:{user_id}'
+
+
+def recent_recipes(user_id):
+    """
+    Возвращает окно ленты пользователя: список (pub_date, id) последних
+    FEED_CACHE_SIZE рецептов его авторов по убыванию и признак того, что
+    окно содержит всю ленту. Окно хранится в кэше до публикации или
+    удаления рецепта автором, на которого подписан пользователь, или до
+    изменения его подписок.
+    """
+    window = cache.get(feed_key(user_id))
+    if window is None:
+        size = settings.FEED_CACHE_SIZE
+        entries = list(Recipe.objects.for_subscriber(user_id).order_by(
+            '-pub_date', '-id'
+        ).values_list('pub_date', 'id')[:size + 1])
+        window = (entries[:size], len(entries) <= size)
+        cache.set(feed_key(user_id), window, settings.FEED_CACHE_TIMEOUT)
+    return window
+
+
+def invalidate_feed(user_id):
+    cache.delete(feed_key(user_id))
+
+
+def invalidate_subscriber_feeds(author_id):
+    """Сбрасывает окна лент всех подписчиков автора."""
+    subscribers = Subscription.objects.filter(
+        subscribed_to_id=author_id
+    ).values_list('subscriber_id', flat=True).iterator()
+    keys = []
+    for subscriber_id in subscribers:
+        keys.append(feed_key(subscriber_id))
+        if len(keys) == BATCH_SIZE:
+            cache.delete_many(keys)
+            keys = []
+    if keys:
+        cache.delete_many(keys)
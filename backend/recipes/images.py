@@ -0,0 +1,230 @@
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import recipes_cache
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Кратно 4, чтобы каждый кусок base64 декодировался независимо.
+CHUNK_SIZE = 64 * 1024
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class PendingImage:
+    """
+    Загруженное изображение во временном файле, ожидающее обработки.
+
+    Пока изображение не передано в очередь (detach), файл удаляется вместе
+    с объектом, например когда транзакция откатывается и отложенная через
+    on_commit обработка так и не запускается.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cleanup = weakref.finalize(self, remove_file, path)
+
+    @classmethod
+    def from_base64(cls, data):
+        """Декодирует base64 по частям во временный файл."""
+        max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        if len(data) * 3 // 4 > max_size:
+            raise ValidationError(
+                f'Размер изображения превышает {max_size} байт.'
+            )
+        file = cls._temporary_file()
+        try:
+            with file:
+                for start in range(0, len(data), CHUNK_SIZE):
+                    file.write(base64.b64decode(
+                        data[start:start + CHUNK_SIZE], validate=True
+                    ))
+        except binascii.Error as error:
+            os.remove(file.name)
+            raise ValidationError('Некорректные данные base64.') from error
+        return cls(file.name).check()
+
+    @classmethod
+    def from_file(cls, uploaded):
+        """Копирует загруженный файл во временный файл."""
+        file = cls._temporary_file()
+        with file:
+            uploaded.seek(0)
+            shutil.copyfileobj(uploaded, file, CHUNK_SIZE)
+        return cls(file.name).check()
+
+    @staticmethod
+    def _temporary_file():
+        return tempfile.NamedTemporaryFile(
+            dir=settings.FILE_UPLOAD_TEMP_DIR, suffix='.upload', delete=False
+        )
+
+    def check(self):
+        """
+        Проверяет по заголовку файла, что это изображение допустимого
+        размера. Полное декодирование выполняется при обработке.
+        """
+        try:
+            with Image.open(self.path) as image:
+                width, height = image.size
+        except (UnidentifiedImageError, Image.DecompressionBombError) as error:
+            self.discard()
+            raise ValidationError(
+                'Загрузите правильное изображение.'
+            ) from error
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            self.discard()
+            raise ValidationError('Слишком большое разрешение изображения.')
+        return self
+
+    def discard(self):
+        self._cleanup()
+
+    def detach(self):
+        """Передает файл обработчику, который удалит его сам."""
+        self._cleanup.detach()
+        return self.path
+
+
+def encode_image(image):
+    """
+    Кодирует изображение в первый поддерживаемый формат из
+    RECIPE_IMAGE_FORMATS. Метаданные (в том числе EXIF) не сохраняются.
+    """
+    for image_format in settings.RECIPE_IMAGE_FORMATS:
+        if image_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        try:
+            image.save(buffer, format=image_format, quality=85)
+        except (KeyError, OSError, ValueError):
+            continue
+        return buffer.getvalue(), image_format.lower()
+    raise ValueError('Нет доступного формата для сохранения изображения')
+
+
+def store_content_addressed(content, extension, prefix='recipes/images'):
+    """Сохраняет файл под именем из его хэша, дубликаты хранятся один раз."""
+    digest = hashlib.sha256(content).hexdigest()
+    name = f'{prefix}/{digest[:2]}/{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name
+
+
+def render_variants(image):
+    """
+    Создает уменьшенные копии изображения по ширинам из
+    RECIPE_IMAGE_VARIANTS и возвращает словарь {поле рецепта: имя файла}.
+    """
+    variants = {}
+    for field, width in settings.RECIPE_IMAGE_VARIANTS.items():
+        variant = image.copy()
+        variant.thumbnail((width, image.height))
+        variants[field] = store_content_addressed(
+            *encode_image(variant), prefix='recipes/variants'
+        )
+    return variants
+
+
+def process_recipe_image(recipe_id, path):
+    """
+    Поворачивает изображение по EXIF, уменьшает до RECIPE_IMAGE_MAX_SIDE,
+    перекодирует без метаданных и записывает в рецепт вместе с
+    уменьшенными копиями.
+    """
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            side = settings.RECIPE_IMAGE_MAX_SIDE
+            image.thumbnail((side, side))
+            name = store_content_addressed(*encode_image(image))
+            variants = render_variants(image)
+        Recipe.objects.filter(pk=recipe_id).update(
+            image=name, updated_at=timezone.now(), **variants
+        )
+        recipes_cache.invalidate()
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+    finally:
+        os.remove(path)
+
+
+def refresh_recipe_variants(recipe_id, name):
+    """Пересоздает уменьшенные копии для уже сохраненного изображения."""
+    close_old_connections()
+    try:
+        with default_storage.open(name) as file, Image.open(file) as image:
+            variants = render_variants(ImageOps.exif_transpose(image))
+        Recipe.objects.filter(pk=recipe_id, image=name).update(
+            updated_at=timezone.now(), **variants
+        )
+        recipes_cache.invalidate()
+    finally:
+        close_old_connections()
+
+
+class ImageQueue:
+    """
+    Очередь обработки изображений.
+
+    При IMAGE_PROCESSING_ASYNC задачи выполняются пулом потоков
+    (IMAGE_PROCESSING_WORKERS) с собственными соединениями с базой, иначе -
+    сразу в текущем потоке и его соединении, что удобно в тестах.
+    """
+
+    def __init__(self):
+        self._executor = None
+
+    def submit(self, func, *args):
+        if not settings.IMAGE_PROCESSING_ASYNC:
+            func(*args)
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                thread_name_prefix='image'
+            )
+        self._executor.submit(self._run, func, *args)
+
+    @staticmethod
+    def _run(func, *args):
+        close_old_connections()
+        try:
+            func(*args)
+        finally:
+            close_old_connections()
+
+
+image_queue = ImageQueue()
+
+
+def schedule_recipe_image(recipe, pending):
+    """
+    Ставит изображение рецепта в очередь после фиксации транзакции. При
+    откате транзакции временный файл удаляется (см. PendingImage).
+    """
+    transaction.on_commit(lambda: image_queue.submit(
+        process_recipe_image, recipe.pk, pending.detach()
+    ))
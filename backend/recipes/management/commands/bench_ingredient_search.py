@@ -0,0 +1,60 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.search import IngredientIndex
+from recipes.synthetic import percentile
+
+ALPHABET = 'абвгдеёжзийклмнопрстуфхцчшщыэюя'
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+class Command(BaseCommand):
+    help = ('Замер задержки поиска ингредиентов по префиксу '
+            'на синтетическом справочнике')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100000,
+                            help='Количество ингредиентов в справочнике')
+        parser.add_argument('--queries', type=int, default=10000,
+                            help='Количество поисковых запросов')
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Ограничение количества результатов')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+
+        def word():
+            return ''.join(rnd.choice(ALPHABET)
+                           for _ in range(rnd.randint(3, 10)))
+
+        names = {' '.join(word() for _ in range(rnd.randint(1, 3)))
+                 for _ in range(options['size'])}
+        rows = [(pk, name, rnd.choice(UNITS))
+                for pk, name in enumerate(sorted(names), start=1)]
+
+        index = IngredientIndex()
+        start = time.perf_counter()
+        index.build(rows)
+        build_time = time.perf_counter() - start
+
+        timings = []
+        found = 0
+        for _ in range(options['queries']):
+            name = rnd.choice(rows)[1]
+            query = name[:rnd.randint(1, min(len(name), 6))].upper()
+            start = time.perf_counter()
+            found += len(index.search(query, options['limit']))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиентов: {len(rows)}, построение индекса: '
+            f'{build_time:.2f} с\n'
+            f'Запросов: {len(timings)}, в среднем результатов: '
+            f'{found / len(timings):.1f}\n'
+            f'p50: {percentile(timings, 50):.3f} мс, '
+            f'p95: {percentile(timings, 95):.3f} мс, '
+            f'p99: {percentile(timings, 99):.3f} мс'
+        ))
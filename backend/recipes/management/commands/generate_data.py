@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = ('Заполнение базы синтетическими пользователями, подписками, '
+            'рецептами, избранным и списками покупок для замеров '
+            'производительности')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Количество пользователей')
+        parser.add_argument('--recipes', type=int, default=10000,
+                            help='Количество рецептов')
+        parser.add_argument('--tags', type=int, default=10,
+                            help='Количество создаваемых тегов')
+        parser.add_argument('--ingredients', type=int, default=2000,
+                            help='Минимальный размер справочника '
+                                 'ингредиентов')
+        parser.add_argument('--subscriptions', type=int, default=20,
+                            help='Наибольшее число подписок пользователя')
+        parser.add_argument('--favorites', type=int, default=30,
+                            help='Наибольшее число рецептов в избранном')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Наибольшее число рецептов в списке покупок')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='synthetic',
+                            help='Префикс имен создаваемых пользователей')
+
+    def handle(self, *args, **options):
+        data = SyntheticData(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            ingredients=options['ingredients'],
+            subscriptions=options['subscriptions'],
+            favorites=options['favorites'],
+            carts=options['carts'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+        )
+        if data.exists():
+            raise CommandError(
+                'Набор с таким префиксом и seed уже загружен'
+            )
+        created = data.generate()
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{name}: {count}' for name, count in created.items())
+        ))
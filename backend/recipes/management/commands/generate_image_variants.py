@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from recipes.images import refresh_recipe_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.IMAGE_PROCESSING_WORKERS,
+            help='Количество параллельных потоков'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии и для рецептов, у которых они уже есть'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(
+            Q(image__isnull=True) | Q(image='')
+        )
+        if not options['force']:
+            recipes = recipes.filter(
+                Q(image_small__isnull=True) | Q(image_medium__isnull=True)
+            )
+        done = 0
+        error_count = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(refresh_recipe_variants, pk, name): pk
+                for pk, name in recipes.values_list('pk', 'image').iterator()
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as error:
+                    self.stderr.write(
+                        f'Ошибка при обработке рецепта {futures[future]}: '
+                        f'{error}')
+                    error_count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {done} изображений\n'
+            f'Обнаружено {error_count} ошибок'
+        ))
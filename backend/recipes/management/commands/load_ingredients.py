@@ -1,39 +1,130 @@
 import csv
+import io
+import json
 import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.cache import ingredients_cache
 from recipes.models import Ingredient
 
-path = os.path.join(settings.BASE_DIR, 'data')
-print(path)
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+BATCH_SIZE = 5000
+
+
+def read_rows(path):
+    """Построчно читает ингредиенты из csv или json файла."""
+    with open(path, encoding='utf-8') as file:
+        if path.endswith('.json'):
+            yield from json.load(file)
+        else:
+            yield from csv.DictReader(file)
+
+
+def chunks(iterable, size):
+    """Разбивает поток строк на списки длиной не более size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class Command(BaseCommand):
-    help = 'Импорт ингридиентов из csv файла в базу данных'
+    help = 'Импорт ингридиентов из csv или json файла в базу данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DEFAULT_PATH,
+            help='Путь к файлу .csv или .json с полями '
+                 'name и measurement_unit'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк, записываемых за один запрос'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загрузка через COPY во временную таблицу (PostgreSQL)'
+        )
 
     def handle(self, *args, **options):
-        add_count = 0
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('Опция --copy доступна только для PostgreSQL')
+        write_batch = (self.copy_batch if options['copy']
+                       else self.insert_batch)
+
+        start = time.monotonic()
+        before = Ingredient.objects.count()
+        seen = set(Ingredient.objects.values_list('name', flat=True))
+        read_count = 0
         error_count = 0
-        for row in csv.DictReader(open(
-                f'{path}/ingredients.csv',
-                encoding='utf-8')
-        ):
-            try:
-                obj, created = Ingredient.objects.get_or_create(
-                    name=row['name'],
-                    measurement_unit=row['measurement_unit']
-                )
-                if created:
-                    add_count += 1
-
-            except IntegrityError as e:
-                self.stderr.write(
-                    f'Ошибка при импорте строки "{row}": {e}')
-                error_count += 1
+        with transaction.atomic():
+            for chunk in chunks(read_rows(path), options['batch_size']):
+                batch = []
+                for row in chunk:
+                    read_count += 1
+                    name = (row.get('name') or '').strip()
+                    unit = (row.get('measurement_unit') or '').strip()
+                    if not name or not unit:
+                        self.stderr.write(
+                            f'Ошибка при импорте строки "{row}": '
+                            f'пустое название или единица измерения')
+                        error_count += 1
+                        continue
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                    batch.append((name, unit))
+                if batch:
+                    write_batch(batch)
+        ingredients_cache.invalidate()
+        add_count = Ingredient.objects.count() - before
+        elapsed = time.monotonic() - start
 
         self.stdout.write(self.style.SUCCESS(
-            f'Загружено в базу {add_count} объектов\n'
-            f'Обнаружено {error_count} ошибок'
+            f'Прочитано {read_count} строк, '
+            f'загружено в базу {add_count} объектов\n'
+            f'Обнаружено {error_count} ошибок\n'
+            f'Время: {elapsed:.2f} с, '
+            f'{read_count / elapsed if elapsed else 0:.0f} строк/с'
         ))
+
+    def insert_batch(self, batch):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=unit)
+             for name, unit in batch],
+            ignore_conflicts=True
+        )
+
+    def copy_batch(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS ingredient_staging '
+                '(name varchar, measurement_unit varchar) ON COMMIT DROP'
+            )
+            cursor.execute('TRUNCATE ingredient_staging')
+            cursor.copy_expert(
+                'COPY ingredient_staging (name, measurement_unit) '
+                'FROM STDIN WITH CSV', buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT name, measurement_unit FROM ingredient_staging '
+                f'ON CONFLICT DO NOTHING'
+            )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes import cart
+from users.models import User
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Сверка сохраненных списков покупок с рецептами в них и '
+            'пересоздание расходящихся списков')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество пользователей, проверяемых за один раз'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        last_pk = 0
+        while True:
+            user_ids = list(User.objects.filter(
+                pk__gt=last_pk
+            ).order_by('pk').values_list('pk', flat=True)[
+                :options['batch_size']
+            ])
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            actual = cart.actual_totals(user_ids)
+            stored = cart.stored_totals(user_ids)
+            users = [user_id for user_id in user_ids
+                     if actual.get(user_id, {}) != stored.get(user_id, {})]
+            if users and not options['check']:
+                cart.rebuild(users)
+            drifted += len(users)
+        message = f'Списков покупок с расхождениями: {drifted}'
+        if options['check']:
+            if drifted:
+                raise CommandError(message)
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{message}, все пересозданы'
+            ))
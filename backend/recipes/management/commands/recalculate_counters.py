@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from recipes.counters import COUNTERS, count_subquery
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Пересчет денормализованных счетчиков избранного, списков '
+            'покупок, рецептов и подписчиков')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество объектов, проверяемых за один запрос'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, field, related_model, fk_name in COUNTERS:
+            fixed = 0
+            last_pk = 0
+            while True:
+                rows = list(model.objects.filter(
+                    pk__gt=last_pk
+                ).order_by('pk').annotate(
+                    actual=count_subquery(related_model, fk_name)
+                ).values_list('pk', field, 'actual')[:batch_size])
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                drifted = [model(pk=pk, **{field: actual})
+                           for pk, stored, actual in rows
+                           if stored != actual]
+                model.objects.bulk_update(drifted, (field,))
+                fixed += len(drifted)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}.{field}: исправлено {fixed} объектов'
+            ))
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.18 on 2026-10-18 00:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'Favorite', 'recipe'),
+    ('recipes', 'Recipe', 'cart_count', 'Cart', 'recipe'),
+    ('users', 'User', 'recipes_count', 'Recipe', 'author'),
+    ('users', 'User', 'subscribers_count', 'Subscription', 'subscribed_to'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app_label, model_name, field, related_name, fk_name in COUNTERS:
+        model = apps.get_model(app_label, model_name)
+        related_model = apps.get_model(
+            'users' if related_name == 'Subscription' else 'recipes',
+            related_name
+        )
+        model.objects.update(**{field: Coalesce(Subquery(
+            related_model.objects.filter(
+                **{fk_name: OuterRef('pk')}
+            ).order_by().values(fk_name).annotate(
+                count=Count('pk')
+            ).values('count')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+        ('recipes', '0007_ingredient_name_upper_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
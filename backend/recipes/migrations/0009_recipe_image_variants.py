@@ -0,0 +1,23 @@
+# Generated by Django 3.2.18 on 2026-10-18 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_medium',
+            field=models.ImageField(default=None, editable=False, null=True, upload_to='', verbose_name='Картинка, средняя'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_small',
+            field=models.ImageField(default=None, editable=False, null=True, upload_to='', verbose_name='Картинка, маленькая'),
+        ),
+    ]
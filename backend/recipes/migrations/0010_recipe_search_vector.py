@@ -0,0 +1,54 @@
+# Generated by Django 3.2.18 on 2026-10-18 00:17
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INDEX_NAME = 'recipes_recipe_search_vector_gin'
+VECTOR_SQL = '''
+    setweight(to_tsvector('{config}', COALESCE(r.name, '')), 'A')
+    || setweight(to_tsvector('{config}', COALESCE(i.names, '')), 'B')
+    || setweight(to_tsvector('{config}', COALESCE(r.text, '')), 'C')
+'''
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        f'ON recipes_recipe USING gin (search_vector)'
+    )
+    vector = ' || '.join(
+        VECTOR_SQL.format(config=config) for config in ('russian', 'english')
+    )
+    schema_editor.execute(
+        f'UPDATE recipes_recipe AS r SET search_vector = {vector} '
+        f'FROM recipes_recipe AS rr LEFT JOIN ('
+        f'SELECT ri.recipe_id, string_agg(ing.name, \' \') AS names '
+        f'FROM recipes_recipeingredient AS ri '
+        f'JOIN recipes_ingredient AS ing ON ing.id = ri.ingredient_id '
+        f'GROUP BY ri.recipe_id) AS i ON i.recipe_id = rr.id '
+        f'WHERE rr.id = r.id'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Вектор поиска'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.18 on 2026-10-18 00:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def fill_cart_ingredients(apps, schema_editor):
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    CartIngredient = apps.get_model('recipes', 'CartIngredient')
+    rows = RecipeIngredient.objects.filter(
+        recipe__cart__isnull=False
+    ).values_list('recipe__cart__user', 'ingredient').annotate(
+        total=Sum('amount')
+    ).order_by().iterator()
+    batch = []
+    for user_id, ingredient_id, total in rows:
+        batch.append(CartIngredient(user_id=user_id,
+                                    ingredient_id=ingredient_id,
+                                    amount=total))
+        if len(batch) == BATCH_SIZE:
+            CartIngredient.objects.bulk_create(batch)
+            batch = []
+    CartIngredient.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0012_recipe_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_ingredient_user_ingredient'),
+        ),
+        migrations.RunPython(fill_cart_ingredients, migrations.RunPython.noop),
+    ]
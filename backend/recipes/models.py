@@ -1,9 +1,17 @@
 from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
+from django.core.exceptions import EmptyResultSet
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Exists, OuterRef
+from django.db import connections, models
+from django.db.models import (Exists, F, OuterRef, Prefetch, Q, Subquery,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, RowNumber
+from django.utils import timezone
 from recipes.validators import validate_color
-from users.models import User
+from users.models import CounterFieldsMixin, Subscription, User
 
 
 class Tag(models.Model):
@@ -91,8 +99,103 @@ class RecipeQuerySet(models.QuerySet):
             ),
         )
 
+    def limit_per_author(self, limit):
+        """
+        Оставляет в выборке не больше limit последних рецептов каждого
+        автора. Ранг считается оконной функцией ROW_NUMBER с разбиением
+        по автору.
+        """
+        ranked = self.order_by().annotate(author_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        )).values('id', 'author_rank')
+        try:
+            sql, params = ranked.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.model.objects.filter(pk__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE author_rank <= %s',
+            (*params, limit)
+        ))
+
+    def update_search_vector(self):
+        """
+        Пересчитывает search_vector по названию (вес A), ингредиентам (B)
+        и тексту (C) рецепта во всех конфигурациях RECIPE_SEARCH_CONFIGS.
+        Работает только на PostgreSQL.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            return
+        ingredients = Coalesce(Subquery(
+            RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+        ), Value(''))
+        vectors = [
+            SearchVector(field, weight=weight, config=config)
+            for config in settings.RECIPE_SEARCH_CONFIGS
+            for field, weight in (
+                ('name', 'A'), (ingredients, 'B'), ('text', 'C')
+            )
+        ]
+        self.update(search_vector=sum(vectors[1:], vectors[0]))
+
+    def search(self, text):
+        """
+        Полнотекстовый поиск по search_vector с сортировкой по
+        релевантности. Вне PostgreSQL - поиск подстроки в названии и тексте.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(Q(name__icontains=text)
+                               | Q(text__icontains=text))
+        configs = iter(settings.RECIPE_SEARCH_CONFIGS)
+        query = SearchQuery(text, config=next(configs),
+                            search_type='websearch')
+        for config in configs:
+            query |= SearchQuery(text, config=config, search_type='websearch')
+        # ts_rank возвращает real; приведение к double precision нужно,
+        # чтобы значение передавалось в курсор и обратно без потери
+        # точности.
+        return self.filter(search_vector=query).annotate(rank=Cast(
+            SearchRank(F('search_vector'), query), models.FloatField()
+        )).order_by('-rank', '-pub_date', '-id')
+
+    def touch(self):
+        """
+        Обновляет updated_at рецептов, представление которых изменилось
+        без сохранения самого рецепта.
+        """
+        return self.update(updated_at=timezone.now())
+
+    def for_subscriber(self, user_id):
+        """
+        Рецепты авторов, на которых подписан пользователь. Авторы выбираются
+        подзапросом author_id IN (...) по индексу подписок.
+        """
+        return self.filter(author__in=Subscription.objects.filter(
+            subscriber_id=user_id
+        ).values('subscribed_to'))
+
+    def with_related(self):
+        """
+        Подгружает автора, теги и ингредиенты фиксированным числом запросов,
+        независимо от количества рецептов в выборке.
+        """
+        return self.select_related('author').defer(
+            'search_vector'
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.all()),
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
 
-class Recipe(models.Model):
+
+class Recipe(CounterFieldsMixin, models.Model):
     """
     Модель для рецептов.
 
@@ -102,9 +205,17 @@ class Recipe(models.Model):
     - ingredients (ManyToManyField): Ингредиенты, связанные с рецептом.
     - name (CharField): Название рецепта.
     - image (ImageField): Картинка рецепта.
+    - image_small, image_medium (ImageField): Уменьшенные копии картинки.
     - text (TextField): Текст рецепта.
     - cooking_time (PositiveSmallIntegerField): Время приготовления рецепта.
     - pub_date (DateTimeField): Дата публикации рецепта.
+    - updated_at (DateTimeField): Дата последнего изменения рецепта, его
+      тегов, ингредиентов или картинки.
+    - search_vector (SearchVectorField): Вектор полнотекстового поиска.
+    - favorites_count (PositiveIntegerField): Сколько раз рецепт добавлен
+      в избранное.
+    - cart_count (PositiveIntegerField): Сколько раз рецепт добавлен
+      в список покупок.
     """
     tags = models.ManyToManyField(
         Tag,
@@ -133,6 +244,18 @@ class Recipe(models.Model):
         default=None,
         verbose_name='Картинка'
     )
+    image_small = models.ImageField(
+        null=True,
+        default=None,
+        editable=False,
+        verbose_name='Картинка, маленькая'
+    )
+    image_medium = models.ImageField(
+        null=True,
+        default=None,
+        editable=False,
+        verbose_name='Картинка, средняя'
+    )
     text = models.TextField(verbose_name='Текст')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления',
@@ -143,11 +266,42 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Вектор поиска'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+
+    counter_fields = ('favorites_count', 'cart_count')
 
     objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -186,6 +340,15 @@ class RecipeIngredient(models.Model):
         return f'{self.ingredient} в {self.recipe}'
 
     class Meta:
+        indexes = [
+            # Покрывающий индекс: сумма по списку покупок и подгрузка
+            # ингредиентов рецептов читают только индекс.
+            models.Index(
+                fields=('recipe', 'ingredient'),
+                include=('amount',),
+                name='recipeingredient_recipe_idx'
+            ),
+        ]
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
 
@@ -221,6 +384,12 @@ class Favorite(models.Model):
                 name='unique_favorite_user_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='favorite_recipe_user_idx'
+            ),
+        ]
         verbose_name = 'Рецеп из избранного'
         verbose_name_plural = 'Рецепты из избранного'
 
@@ -256,5 +425,55 @@ class Cart(models.Model):
                 name='unique_cart_user_recipes'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'user'),
+                name='cart_recipe_user_idx'
+            ),
+        ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class CartIngredient(models.Model):
+    """
+    Модель для суммарного количества ингредиента в списке покупок.
+
+    Строки поддерживаются инкрементально (см. recipes.cart) при добавлении
+    и удалении рецептов из списка покупок и при изменении ингредиентов
+    рецептов, поэтому список покупок читается без агрегации.
+
+    Поля:
+    - user (ForeignKey): Пользователь.
+    - ingredient (ForeignKey): Ингредиент.
+    - amount (PositiveIntegerField): Суммарное количество.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+
+    def __str__(self):
+        return f'{self.ingredient} в списке покупок у {self.user}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_cart_ingredient_user_ingredient'
+            )
+        ]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
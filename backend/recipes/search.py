@@ -0,0 +1,87 @@
+import bisect
+import re
+import threading
+
+from .cache import ingredients_cache
+from .models import Ingredient
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fold(text):
+    """Приводит строку к виду для поиска без учета регистра и ё/е."""
+    return text.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Префиксный индекс ингредиентов в памяти процесса.
+
+    Хранит два отсортированных массива: по полному названию и по началам
+    слов внутри названия. Поиск - бинарный поиск начала диапазона и проход
+    по найденным элементам, O(log n + k). Сначала выдаются совпадения с
+    началом названия, затем - с началом одного из следующих слов.
+    Индекс перестраивается при смене версии справочника ingredients_cache.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._lock = threading.Lock()
+        self._state = ({}, [], [])
+
+    def build(self, rows):
+        """Строит индекс по строкам (id, name, measurement_unit)."""
+        ingredients = {}
+        names = []
+        words = []
+        for pk, name, measurement_unit in rows:
+            ingredients[pk] = Ingredient(
+                id=pk, name=name, measurement_unit=measurement_unit
+            )
+            folded = fold(name)
+            names.append((folded, pk))
+            for match in list(WORD_RE.finditer(folded))[1:]:
+                words.append((folded[match.start():], pk))
+        names.sort()
+        words.sort()
+        self._state = (ingredients, names, words)
+
+    def refresh(self):
+        """Перестраивает индекс из базы, если справочник изменился."""
+        version = ingredients_cache.version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self.build(Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                ).iterator())
+                self._version = version
+
+    @staticmethod
+    def _prefix_matches(array, prefix):
+        index = bisect.bisect_left(array, (prefix,))
+        while index < len(array) and array[index][0].startswith(prefix):
+            yield array[index][1]
+            index += 1
+
+    def search(self, query, limit=None):
+        """
+        Возвращает ингредиенты, название или одно из слов названия которых
+        начинается с query.
+        """
+        ingredients, names, words = self._state
+        prefix = fold(query.strip())
+        found = []
+        seen = set()
+        for array in (names, words):
+            for pk in self._prefix_matches(array, prefix):
+                if limit is not None and len(found) >= limit:
+                    return found
+                if pk not in seen:
+                    seen.add(pk)
+                    found.append(ingredients[pk])
+        return found
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import Subscription, User
+
+from . import cart, feed
+from .cache import ingredients_cache, recipes_cache, tags_cache
+from .counters import COUNTERS, change_counter
+from .models import Cart, Favorite, Ingredient, Recipe, Tag
+from .user_lists import USER_LISTS
+
+# Поля автора, которые выводятся в списке рецептов.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags_cache(**kwargs):
+    """Сбрасывает кэш тегов при любом изменении тега."""
+    tags_cache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredients_cache(**kwargs):
+    """Сбрасывает кэш ингредиентов при любом изменении ингредиента."""
+    ingredients_cache.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_recipes_cache(sender, created=False, **kwargs):
+    """
+    Сбрасывает общий кэш страниц списка рецептов после фиксации
+    изменения рецепта, тега или ингредиента. Новые теги и ингредиенты
+    в рецептах еще не используются.
+    """
+    if sender is Recipe or not created:
+        transaction.on_commit(recipes_cache.invalidate)
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipes_cache_for_author(created, update_fields, **kwargs):
+    """Сбрасывает кэш списка рецептов при изменении данных автора."""
+    if not created and (update_fields is None
+                        or AUTHOR_FIELDS & set(update_fields)):
+        transaction.on_commit(recipes_cache.invalidate)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Cart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Cart)
+@receiver(post_delete, sender=Subscription)
+def invalidate_user_list(sender, instance, **kwargs):
+    """Сбрасывает кэш списка пользователя при изменении через ORM."""
+    user_list = USER_LISTS[sender]
+    user_list.invalidate(getattr(instance, f'{user_list.user_field}_id'))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_recipes_search_vector(instance, created, **kwargs):
+    """Обновляет поисковый вектор рецептов при изменении ингредиента."""
+    if not created:
+        Recipe.objects.filter(ingredients=instance).update_search_vector()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes(sender, instance, created, **kwargs):
+    """
+    Обновляет updated_at рецептов при изменении тега или ингредиента,
+    которые входят в их представление.
+    """
+    if not created:
+        touch_related_recipes(sender, instance)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_before_delete(sender, instance, **kwargs):
+    """Обновляет updated_at рецептов до удаления тега или ингредиента."""
+    touch_related_recipes(sender, instance)
+
+
+def touch_related_recipes(sender, instance):
+    lookup = 'tags' if sender is Tag else 'ingredients'
+    Recipe.objects.filter(**{lookup: instance}).touch()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_subscriber_feeds(instance, created=True, **kwargs):
+    """
+    Сбрасывает ленты подписчиков при публикации и удалении рецепта.
+    Изменение рецепта (created=False) ленту не меняет.
+    """
+    if created:
+        transaction.on_commit(
+            lambda: feed.invalidate_subscriber_feeds(instance.author_id)
+        )
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_feed(instance, created=True, **kwargs):
+    """Сбрасывает ленту пользователя при подписке и отписке."""
+    if created:
+        transaction.on_commit(
+            lambda: feed.invalidate_feed(instance.subscriber_id)
+        )
+
+
+@receiver(post_save, sender=Cart)
+def add_to_cart_totals(instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в список покупок пользователя."""
+    if created:
+        cart.add_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=Cart)
+def remove_from_cart_totals(instance, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из списка покупок. Выполняется до
+    удаления, чтобы при каскадном удалении рецепта его ингредиенты еще
+    были в базе.
+    """
+    cart.remove_recipes(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Cart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def increment_counters(sender, instance, created, **kwargs):
+    """Увеличивает денормализованные счетчики при создании строки."""
+    if created:
+        update_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Cart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def decrement_counters(sender, instance, **kwargs):
+    """Уменьшает денормализованные счетчики при удалении строки."""
+    update_counters(sender, instance, -1)
+
+
+def update_counters(sender, instance, delta):
+    for model, field, related_model, fk_name in COUNTERS:
+        if sender is related_model:
+            change_counter(
+                model, getattr(instance, f'{fk_name}_id'), field, delta
+            )
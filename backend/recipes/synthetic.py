@@ -0,0 +1,212 @@
+import io
+import math
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from users.models import Subscription, User
+
+from . import cart
+from .cache import ingredients_cache, recipes_cache, tags_cache
+from .models import Cart, Favorite, Ingredient, Recipe, RecipeIngredient, Tag
+
+BATCH_SIZE = 5000
+WORDS = ('борщ', 'салат', 'суп', 'пирог', 'рагу', 'каша', 'паста', 'омлет',
+         'запеканка', 'плов', 'soup', 'salad', 'pie', 'stew', 'curry')
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_create(model, objects, **kwargs):
+    for batch in batched(objects):
+        model.objects.bulk_create(batch, **kwargs)
+
+
+def percentile(values, percent):
+    """
+    Перцентиль отсортированного списка по методу ближайшего ранга,
+    определен и для одного значения.
+    """
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def busiest_user():
+    """Пользователь с наибольшим числом рецептов в избранном или None."""
+    row = Favorite.objects.values('user').annotate(
+        total=Count('id')
+    ).order_by('-total').first()
+    return None if row is None else User.objects.get(pk=row['user'])
+
+
+class SyntheticData:
+    """
+    Генератор синтетических данных для нагрузочных замеров.
+
+    Все объекты создаются через bulk_create пачками, случайные значения
+    берутся из генератора с фиксированным seed, поэтому при одинаковых
+    параметрах получается одинаковый набор данных. Имена пользователей
+    начинаются с prefix, что позволяет создавать несколько наборов.
+    """
+
+    def __init__(self, users=1000, recipes=10000, tags=10, ingredients=2000,
+                 subscriptions=20, favorites=30, carts=5,
+                 recipe_ingredients=(3, 12), recipe_tags=(1, 3), seed=42,
+                 prefix='synthetic'):
+        self.counts = {
+            'users': users, 'recipes': recipes, 'tags': tags,
+            'ingredients': ingredients, 'subscriptions': subscriptions,
+            'favorites': favorites, 'carts': carts,
+        }
+        self.recipe_ingredients = recipe_ingredients
+        self.recipe_tags = recipe_tags
+        self.random = random.Random(seed)
+        self.prefix = f'{prefix}{seed}'
+
+    def exists(self):
+        """Проверяет, создан ли уже набор с таким prefix и seed."""
+        return User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).exists()
+
+    def generate(self):
+        """Создает данные и возвращает количество объектов по видам."""
+        tag_ids = self.create_tags()
+        ingredient_ids = self.create_ingredients()
+        user_ids = self.create_users()
+        recipe_ids = self.create_recipes(user_ids)
+        self.create_recipe_links(recipe_ids, tag_ids, ingredient_ids)
+        self.create_user_links(user_ids, recipe_ids)
+        self.analyze()
+        Recipe.objects.filter(pk__in=recipe_ids).update_search_vector()
+        cart.rebuild(user_ids)
+        call_command('recalculate_counters', stdout=io.StringIO())
+        tags_cache.invalidate()
+        ingredients_cache.invalidate()
+        recipes_cache.invalidate()
+        return {'users': len(user_ids), 'recipes': len(recipe_ids),
+                'tags': len(tag_ids), 'ingredients': len(ingredient_ids)}
+
+    @staticmethod
+    def analyze():
+        """
+        Обновляет статистику PostgreSQL после массовой вставки: с
+        устаревшей статистикой планировщик выбирает для пересчета
+        search_vector план, который выполняется в десятки раз дольше.
+        """
+        if connection.vendor != 'postgresql':
+            return
+        models = (Tag, Ingredient, User, Recipe, Recipe.tags.through,
+                  RecipeIngredient, Subscription, Favorite, Cart)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE {}'.format(', '.join(
+                connection.ops.quote_name(model._meta.db_table)
+                for model in models
+            )))
+
+    def create_tags(self):
+        bulk_create(Tag, (
+            Tag(name=f'{self.prefix} tag {i}',
+                slug=f'{self.prefix}-tag-{i}',
+                color=f'#{self.random.randrange(0x1000000):06X}')
+            for i in range(self.counts['tags'])
+        ), ignore_conflicts=True)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_ingredients(self):
+        missing = self.counts['ingredients'] - Ingredient.objects.count()
+        bulk_create(Ingredient, (
+            Ingredient(name=f'{self.prefix} ingredient {i}',
+                       measurement_unit=self.random.choice(('г', 'мл', 'шт')))
+            for i in range(max(missing, 0))
+        ), ignore_conflicts=True)
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_users(self):
+        password = make_password(self.prefix)
+        bulk_create(User, (
+            User(username=f'{self.prefix}_{i}',
+                 email=f'{self.prefix}_{i}@example.org',
+                 first_name='Имя', last_name='Фамилия', password=password)
+            for i in range(self.counts['users'])
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, user_ids):
+        # Небольшая доля активных авторов публикует большинство рецептов.
+        authors = user_ids[:max(len(user_ids) // 10, 1)]
+        name = f'{self.prefix} рецепт'
+        bulk_create(Recipe, (
+            Recipe(
+                author_id=self.random.choice(
+                    authors if self.random.random() < 0.8 else user_ids
+                ),
+                name=f'{name} {i} {self.random.choice(WORDS)}',
+                text=' '.join(self.random.choices(WORDS, k=30)),
+                cooking_time=self.random.randint(5, 180)
+            )
+            for i in range(self.counts['recipes'])
+        ))
+        recipe_ids = list(Recipe.objects.filter(
+            name__startswith=name
+        ).order_by('id').values_list('id', flat=True))
+        now = timezone.now()
+        for batch in batched(recipe_ids, 1000):
+            Recipe.objects.bulk_update([
+                Recipe(pk=pk, pub_date=now - timedelta(
+                    minutes=self.random.randrange(60 * 24 * 730)))
+                for pk in batch
+            ], ('pub_date',))
+        return recipe_ids
+
+    def sample(self, population, bounds):
+        k = min(self.random.randint(*bounds), len(population))
+        return self.random.sample(population, k)
+
+    def create_recipe_links(self, recipe_ids, tag_ids, ingredient_ids):
+        bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.sample(tag_ids, self.recipe_tags)
+        ))
+        bulk_create(RecipeIngredient, (
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                             amount=self.random.randint(1, 1000))
+            for recipe_id in recipe_ids
+            for ingredient_id in self.sample(ingredient_ids,
+                                             self.recipe_ingredients)
+        ))
+
+    def create_user_links(self, user_ids, recipe_ids):
+        authors = user_ids[:max(len(user_ids) // 10, 1)]
+        links = (
+            (Subscription, 'subscriptions', authors,
+             lambda user, author: Subscription(subscriber_id=user,
+                                               subscribed_to_id=author)),
+            (Favorite, 'favorites', recipe_ids,
+             lambda user, recipe: Favorite(user_id=user, recipe_id=recipe)),
+            (Cart, 'carts', recipe_ids,
+             lambda user, recipe: Cart(user_id=user, recipe_id=recipe)),
+        )
+        for model, name, population, build in links:
+            bounds = (0, self.counts[name])
+            bulk_create(model, (
+                build(user_id, target_id)
+                for user_id in user_ids
+                for target_id in self.sample(population, bounds)
+                if target_id != user_id or model is not Subscription
+            ), ignore_conflicts=True)
@@ -0,0 +1,105 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def upload(size=(2400, 1600)):
+    """JPEG с EXIF для загрузки через форму."""
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format='JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_ASYNC=False)
+class RecipeAdminImageTest(TestCase):
+    """Изображения, загруженные в админке, проходят обработку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin',
+            first_name='Админ', last_name='Админ'
+        )
+        cls.tag = Tag.objects.create(name='Обед', color='#000000',
+                                     slug='lunch')
+        cls.ingredient = Ingredient.objects.create(name='Соль',
+                                                   measurement_unit='г')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def form_data(self, **data):
+        return {
+            'author': self.admin.pk, 'tags': [self.tag.pk], 'name': 'Суп',
+            'text': 'Текст', 'cooking_time': 30,
+            'recipeingredient_set-TOTAL_FORMS': 1,
+            'recipeingredient_set-INITIAL_FORMS': 0,
+            'recipeingredient_set-0-ingredient': self.ingredient.pk,
+            'recipeingredient_set-0-amount': 10,
+            **data,
+        }
+
+    def post(self, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+
+    def assert_processed(self, recipe):
+        self.assertRegex(recipe.image.name,
+                         r'^recipes/images/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+        with default_storage.open(recipe.image.name) as file:
+            with Image.open(file) as image:
+                self.assertEqual(max(image.size), 1920)
+                self.assertEqual(len(image.getexif()), 0)
+        self.assertTrue(recipe.image_small.name.startswith(
+            'recipes/variants/'
+        ))
+        self.assertTrue(recipe.image_medium.name.startswith(
+            'recipes/variants/'
+        ))
+
+    def test_add(self):
+        self.post('/admin/recipes/recipe/add/',
+                  self.form_data(image=upload()))
+        self.assert_processed(Recipe.objects.get())
+
+    def test_change(self):
+        self.post('/admin/recipes/recipe/add/',
+                  self.form_data(image=upload()))
+        recipe = Recipe.objects.get()
+        old = (recipe.image.name, recipe.image_small.name)
+        self.post(f'/admin/recipes/recipe/{recipe.pk}/change/',
+                  self.form_data(image=upload((2000, 3000))))
+        recipe.refresh_from_db()
+        self.assert_processed(recipe)
+        self.assertNotEqual((recipe.image.name, recipe.image_small.name),
+                            old)
+
+    def test_change_without_image(self):
+        self.post('/admin/recipes/recipe/add/',
+                  self.form_data(image=upload()))
+        recipe = Recipe.objects.get()
+        image = recipe.image.name
+        self.post(f'/admin/recipes/recipe/{recipe.pk}/change/',
+                  self.form_data(name='Борщ'))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Борщ')
+        self.assertEqual(recipe.image.name, image)
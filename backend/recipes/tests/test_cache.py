@@ -0,0 +1,36 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.cache import ReferenceCache
+
+
+@override_settings(REFERENCE_CACHE_VERSION_TTL=60)
+class ReferenceCacheVersionTest(TestCase):
+    """Версия справочника запоминается в процессе на короткое время."""
+
+    def setUp(self):
+        self.reference = ReferenceCache('test')
+
+    def test_version_is_remembered(self):
+        version = self.reference.version()
+        self.reference.set('key', 'value', version)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.reference.version(), version)
+            self.assertEqual(self.reference.get('key', version), 'value')
+
+    def test_invalidate(self):
+        version = self.reference.version()
+        self.reference.invalidate()
+        with self.assertNumQueries(0):
+            self.assertNotEqual(self.reference.version(), version)
+
+    def test_change_from_other_process(self):
+        version = self.reference.version()
+        cache.set(self.reference.version_key, version + 1, None)
+        self.assertEqual(self.reference.version(), version)
+        later = time.monotonic() + 61
+        with mock.patch('recipes.cache.time.monotonic', return_value=later):
+            self.assertEqual(self.reference.version(), version + 1)
@@ -0,0 +1,23 @@
+from django.test import SimpleTestCase, override_settings
+
+from recipes.checks import check_shared_cache
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """Проверка того, что кэш по умолчанию общий для процессов."""
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_local_cache(self):
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['recipes.W001']
+        )
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }})
+    def test_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
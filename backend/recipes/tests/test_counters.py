@@ -0,0 +1,67 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from recipes.user_lists import favorites, subscriptions
+from users.models import User
+
+
+class CounterSaveTest(TestCase):
+    """Сохранение объекта не затирает счетчики, измененные другим кодом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader, cls.other = [
+            User.objects.create(username=name, email=f'{name}@example.com',
+                                first_name=name, last_name=name)
+            for name in ('author', 'reader', 'other')
+        ]
+        cls.tag = Tag.objects.create(name='Обед', color='#000000',
+                                     slug='lunch')
+        cls.recipe = Recipe.objects.create(author=cls.author, name='Суп',
+                                           text='Текст', cooking_time=30)
+        cls.recipe.tags.set([cls.tag])
+        favorites.add(cls.reader.pk, [cls.recipe.pk])
+        subscriptions.add(cls.reader.pk, [cls.author.pk])
+
+    def test_stale_recipe_save(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(stale.favorites_count, 1)
+        favorites.add(self.other.pk, [self.recipe.pk])
+        stale.name = 'Борщ'
+        stale.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Борщ')
+        self.assertEqual(self.recipe.favorites_count, 2)
+
+    def test_stale_user_save(self):
+        stale = User.objects.get(pk=self.author.pk)
+        self.assertEqual(stale.subscribers_count, 1)
+        self.assertEqual(stale.recipes_count, 1)
+        subscriptions.add(self.other.pk, [self.author.pk])
+        Recipe.objects.create(author=self.author, name='Каша',
+                              text='Текст', cooking_time=10)
+        stale.first_name = 'Автор'
+        stale.save()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.first_name, 'Автор')
+        self.assertEqual(self.author.subscribers_count, 2)
+        self.assertEqual(self.author.recipes_count, 2)
+
+    def test_recipe_update_through_api(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.patch(f'/api/recipes/{self.recipe.pk}/', {
+            'name': 'Борщ', 'tags': [self.tag.pk]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Борщ')
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_create_saves_counters(self):
+        recipe = Recipe(author=self.author, name='Плов', text='Текст',
+                        cooking_time=90, favorites_count=3)
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 3)
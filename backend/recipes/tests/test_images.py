@@ -0,0 +1,108 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.admin import RecipeAdmin
+from recipes.images import PendingImage, schedule_recipe_image
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+UPLOAD_DIR = tempfile.mkdtemp()
+
+
+def jpeg():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(FILE_UPLOAD_TEMP_DIR=UPLOAD_DIR,
+                   IMAGE_PROCESSING_ASYNC=False)
+class PendingImageCleanupTest(TestCase):
+    """Временные файлы изображений не остаются после отката транзакции."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Автор'
+        )
+        cls.tag = Tag.objects.create(name='Обед', color='#000000',
+                                     slug='lunch')
+        cls.ingredient = Ingredient.objects.create(name='Соль',
+                                                   measurement_unit='г')
+        cls.recipe = Recipe.objects.create(author=cls.author, name='Суп',
+                                           text='Текст', cooking_time=30)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(UPLOAD_DIR, ignore_errors=True)
+
+    def pending(self):
+        return PendingImage.from_base64(base64.b64encode(jpeg()).decode())
+
+    def assert_no_uploads(self):
+        self.assertEqual(os.listdir(UPLOAD_DIR), [])
+
+    def test_rollback(self):
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                schedule_recipe_image(self.recipe, self.pending())
+                raise DatabaseError
+        self.assert_no_uploads()
+
+    def test_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_recipe_image(self.recipe, self.pending())
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.startswith('recipes/images/'))
+        self.assert_no_uploads()
+
+    def test_failed_api_create(self):
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(self.author)
+        with mock.patch('recipes.models.RecipeIngredient.objects.bulk_create',
+                        side_effect=DatabaseError):
+            response = client.post('/api/recipes/', {
+                'tags': [self.tag.pk], 'name': 'Борщ', 'text': 'Текст',
+                'cooking_time': 60,
+                'ingredients': [{'id': self.ingredient.pk, 'amount': 10}],
+                'image': 'data:image/jpeg;base64,'
+                         + base64.b64encode(jpeg()).decode(),
+            }, format='json')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Recipe.objects.filter(name='Борщ').exists())
+        self.assert_no_uploads()
+
+    def test_failed_admin_add(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin',
+            first_name='Админ', last_name='Админ'
+        )
+        self.client.force_login(admin)
+        self.client.raise_request_exception = False
+        with mock.patch.object(RecipeAdmin, 'save_related',
+                               side_effect=DatabaseError):
+            response = self.client.post('/admin/recipes/recipe/add/', {
+                'author': admin.pk, 'tags': [self.tag.pk], 'name': 'Борщ',
+                'text': 'Текст', 'cooking_time': 60,
+                'image': SimpleUploadedFile('photo.jpg', jpeg(),
+                                            content_type='image/jpeg'),
+                'recipeingredient_set-TOTAL_FORMS': 1,
+                'recipeingredient_set-INITIAL_FORMS': 0,
+                'recipeingredient_set-0-ingredient': self.ingredient.pk,
+                'recipeingredient_set-0-amount': 10,
+            })
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Recipe.objects.filter(name='Борщ').exists())
+        self.assert_no_uploads()
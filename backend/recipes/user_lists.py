@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from users.models import Subscription
+
+from . import cart, feed
+from .counters import change_counters
+from .models import Cart, Favorite
+
+
+class UserList:
+    """
+    Список объектов пользователя (избранное, список покупок, подписки)
+    со связанными счетчиками.
+
+    Добавление и удаление выполняются одним запросом INSERT ... ON
+    CONFLICT DO NOTHING / DELETE с RETURNING, поэтому повторные и
+    параллельные запросы не приводят к ошибкам уникальности. Сигналы
+    модели при этом не отправляются: счетчик counter у объектов списка и
+    обработчики on_add/on_remove вызываются здесь же для реально
+    измененных строк.
+
+    Множество id объектов списка пользователя кэшируется (ids) и
+    сбрасывается после фиксации любого изменения списка.
+    """
+
+    def __init__(self, model, user_field, target_field, counter,
+                 on_add=None, on_remove=None):
+        self.model = model
+        self.user_field = user_field
+        self.target_field = target_field
+        self.target_model = model._meta.get_field(target_field).related_model
+        self.counter = counter
+        self.on_add = on_add
+        self.on_remove = on_remove
+
+    def cache_key(self, user_id):
+        return f'user_list:{self.model._meta.model_name}:{user_id}'
+
+    def ids(self, user_id):
+        """Возвращает множество id объектов в списке пользователя."""
+        ids = cache.get(self.cache_key(user_id))
+        if ids is None:
+            ids = self.load(user_id)
+        return ids
+
+    def load(self, user_id):
+        """Читает множество id из базы и сохраняет его в кэше."""
+        ids = frozenset(self.model.objects.filter(
+            **{self.user_field: user_id}
+        ).values_list(f'{self.target_field}_id', flat=True))
+        cache.set(self.cache_key(user_id), ids,
+                  settings.USER_LIST_CACHE_TIMEOUT)
+        return ids
+
+    def invalidate(self, user_id):
+        """Сбрасывает кэш списка пользователя после фиксации транзакции."""
+        transaction.on_commit(lambda: cache.delete(self.cache_key(user_id)))
+
+    def sql_params(self, target_ids):
+        opts = self.model._meta
+        names = {
+            'table': opts.db_table,
+            'user': opts.get_field(self.user_field).column,
+            'target': opts.get_field(self.target_field).column,
+            'targets': self.target_model._meta.db_table,
+            'target_pk': self.target_model._meta.pk.column,
+        }
+        params = {name: connection.ops.quote_name(value)
+                  for name, value in names.items()}
+        params['ids'] = ', '.join(['%s'] * len(target_ids))
+        return params
+
+    @transaction.atomic
+    def add(self, user_id, target_ids):
+        """
+        Добавляет существующие объекты из target_ids в список
+        пользователя и возвращает id добавленных.
+        """
+        target_ids = sorted(set(target_ids))
+        if not target_ids:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} ({user}, {target}) '
+                'SELECT %s, {target_pk} FROM {targets} '
+                'WHERE {target_pk} IN ({ids}) '
+                'ON CONFLICT DO NOTHING RETURNING {target}'.format(
+                    **self.sql_params(target_ids)
+                ),
+                [user_id, *target_ids]
+            )
+            added = sorted(row[0] for row in cursor.fetchall())
+        if added:
+            self.invalidate(user_id)
+            change_counters(self.target_model, added, self.counter, 1)
+            if self.on_add:
+                self.on_add(user_id, added)
+        return added
+
+    @transaction.atomic
+    def remove(self, user_id, target_ids):
+        """
+        Удаляет объекты target_ids из списка пользователя и возвращает id
+        удаленных.
+        """
+        target_ids = sorted(set(target_ids))
+        if not target_ids:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {table} WHERE {user} = %s '
+                'AND {target} IN ({ids}) RETURNING {target}'.format(
+                    **self.sql_params(target_ids)
+                ),
+                [user_id, *target_ids]
+            )
+            removed = sorted(row[0] for row in cursor.fetchall())
+        if removed:
+            self.invalidate(user_id)
+            change_counters(self.target_model, removed, self.counter, -1)
+            if self.on_remove:
+                self.on_remove(user_id, removed)
+        return removed
+
+
+def user_list_ids(user_id, user_lists):
+    """
+    Возвращает множества id объектов пользователя для нескольких списков,
+    читая их из кэша одним обращением.
+    """
+    keys = [user_list.cache_key(user_id) for user_list in user_lists]
+    cached = cache.get_many(keys)
+    return [
+        cached[key] if key in cached else user_list.load(user_id)
+        for key, user_list in zip(keys, user_lists)
+    ]
+
+
+def invalidate_feed(user_id, author_ids):
+    """Сбрасывает ленту пользователя после фиксации транзакции."""
+    transaction.on_commit(lambda: feed.invalidate_feed(user_id))
+
+
+favorites = UserList(Favorite, 'user', 'recipe', 'favorites_count')
+carts = UserList(Cart, 'user', 'recipe', 'cart_count',
+                 on_add=cart.add_recipes, on_remove=cart.remove_recipes)
+subscriptions = UserList(Subscription, 'subscriber', 'subscribed_to',
+                         'subscribers_count',
+                         on_add=invalidate_feed, on_remove=invalidate_feed)
+
+USER_LISTS = {
+    user_list.model: user_list
+    for user_list in (favorites, carts, subscriptions)
+}
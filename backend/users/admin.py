@@ -15,13 +15,17 @@ class UserAdmin(admin.ModelAdmin):
     - 'email': Адрес электронной почты пользователя.
     - 'first_name': Имя пользователя.
     - 'last_name': Фамилия пользователя.
+    - 'recipes_count': Количество рецептов.
+    - 'subscribers_count': Количество подписчиков.
     """
     list_display = (
         'pk',
         'username',
         'email',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'subscribers_count'
     )
     empty_value_display = '-пусто-'
     list_filter = ('is_active',)
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.18 on 2026-10-18 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['subscribed_to', 'subscriber'], name='subscription_author_idx'),
+        ),
+    ]
@@ -5,7 +5,35 @@ from django.db import models
 from .validators import validate_username
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Не записывает денормализованные счетчики counter_fields при обычном
+    сохранении существующего объекта.
+
+    Счетчики меняются только запросами UPDATE ... SET field = field +
+    delta (recipes.counters), а значения в загруженном объекте могут быть
+    устаревшими. Поэтому save() без update_fields сохраняет все
+    загруженные поля, кроме счетчиков.
+    """
+    counter_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields is None and not force_insert and not (
+            self._state.adding or self.pk is None
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(force_insert=force_insert, force_update=force_update,
+                     using=using, update_fields=update_fields)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """
     Пользователь в системе.
 
@@ -15,6 +43,8 @@ class User(AbstractUser):
     - email (EmailField): Уникальный адрес электронной почты.
     - first_name (CharField): Имя пользователя.
     - last_name (CharField): Фамилия пользователя.
+    - recipes_count (PositiveIntegerField): Количество рецептов автора.
+    - subscribers_count (PositiveIntegerField): Количество подписчиков.
     """
     username = models.CharField(
         max_length=settings.NAME_PASS_LENGTH,
@@ -41,6 +71,18 @@ class User(AbstractUser):
         blank=False,
         verbose_name='Фамилия'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+
+    counter_fields = ('recipes_count', 'subscribers_count')
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -84,3 +126,9 @@ class Subscription(models.Model):
                 name='unique_subscribe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('subscribed_to', 'subscriber'),
+                name='subscription_author_idx'
+            ),
+        ]